@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+将InsightFace识别模型转换为FP16
+输入输出保持float32，转换后在config.yaml中设置 face_recognition.recognition_model_path 使用
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def convert_to_fp16(input_path: Path, output_path: Path) -> bool:
+    """
+    转换ONNX模型权重为FP16
+    
+    Args:
+        input_path: 原始模型路径
+        output_path: 输出模型路径
+        
+    Returns:
+        是否转换成功
+    """
+    try:
+        import onnx
+        from onnxconverter_common import float16
+    except ImportError:
+        logger.error("缺少依赖，请运行: pip install onnx onnxconverter-common")
+        return False
+    
+    model = onnx.load(str(input_path))
+    model_fp16 = float16.convert_float_to_float16(model, keep_io_types=True)
+    onnx.save(model_fp16, str(output_path))
+    
+    logger.info(f"✅ FP16模型已保存: {output_path}")
+    logger.info(f"在config.yaml中设置 face_recognition.recognition_model_path: {output_path}")
+    return True
+
+
+def main():
+    default_model = Path.home() / '.insightface' / 'models' / 'buffalo_l' / 'w600k_r50.onnx'
+    
+    parser = argparse.ArgumentParser(description='将InsightFace识别模型转换为FP16')
+    parser.add_argument('--input', type=Path, default=default_model, help='原始识别模型路径')
+    parser.add_argument('--output', type=Path, default=None, help='输出路径（默认在原文件名后加_fp16）')
+    args = parser.parse_args()
+    
+    if not args.input.exists():
+        logger.error(f"模型文件不存在: {args.input}")
+        return 1
+    
+    output_path = args.output or args.input.with_name(f"{args.input.stem}_fp16.onnx")
+    return 0 if convert_to_fp16(args.input, output_path) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,6 +5,13 @@ TMDB API客户端
 import requests
 import time
 from typing import List, Dict, Any, Optional
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from ..utils.config_loader import config
 from ..utils.logger import get_logger
 
@@ -55,6 +62,8 @@ class TMDBClient:
             self.last_request_time = time.time()
             
             response.raise_for_status()
+            if ORJSON_AVAILABLE:
+                return orjson.loads(response.content)
             return response.json()
             
         except requests.exceptions.RequestException as e:
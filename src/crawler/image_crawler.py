@@ -2,20 +2,157 @@
 TMDB图片爬取模块
 专门使用TMDB API获取演员的所有高质量图片
 """
+import io
+import json
 import os
+import re
+import sqlite3
 import requests
-import hashlib
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import random
+import threading
+import numpy as np
+from PIL import Image
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from urllib.parse import urlsplit
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+# orjson相关导入（可选，解析速度更快）
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from ..utils.config_loader import config
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 单张图片大小范围
+MIN_IMAGE_BYTES = 1000
+MAX_IMAGE_BYTES = 20 * 1024 * 1024  # 20MB
+# 图片边长范围（像素）
+MIN_IMAGE_DIMENSION = 100
+MAX_IMAGE_DIMENSION = 10000
+# 演员目录下持久化图片哈希的文件名
+HASHES_FILENAME = '.hashes.txt'
+# 演员目录下记录因与其他演员重复而跳过的图片标识的文件名
+SKIPPED_KEYS_FILENAME = '.skipped.txt'
+# TMDB API响应缓存文件名及有效期（秒）
+API_CACHE_FILENAME = 'api_cache.db'
+API_CACHE_TTL = 24 * 60 * 60
+# 感知哈希（dHash）汉明距离不超过该值视为重复图片
+DHASH_DISTANCE_THRESHOLD = 6
+# 文件名中需要移除的字符（保留字母数字、空格、-、_）
+_UNSAFE_NAME_RE = re.compile(r'[^\w \-]+')
+
+
+class PerceptualHashIndex:
+    """
+    感知哈希索引
+    
+    将64位dHash切分为8个8位分段分别建桶（LSH分段），查询时只对至少有一个
+    分段完全相同的候选哈希计算汉明距离。汉明距离不超过7时必有一个分段相同，
+    因此在默认阈值下不会漏判。
+    """
+    
+    BANDS = 8
+    BAND_BITS = 8
+    
+    def __init__(self, hashes: List[int] = None, threshold: int = DHASH_DISTANCE_THRESHOLD):
+        """
+        初始化感知哈希索引
+        
+        Args:
+            hashes: 初始哈希列表
+            threshold: 判定为重复的最大汉明距离
+        """
+        self.threshold = threshold
+        self._hashes = []
+        self._buckets = [{} for _ in range(self.BANDS)]
+        for image_hash in hashes or []:
+            self.add(image_hash)
+    
+    def _bands(self, image_hash: int):
+        """拆分哈希的各个分段"""
+        mask = (1 << self.BAND_BITS) - 1
+        for band in range(self.BANDS):
+            yield band, (image_hash >> (band * self.BAND_BITS)) & mask
+    
+    def add(self, image_hash: int):
+        """添加哈希"""
+        self._hashes.append(image_hash)
+        for band, key in self._bands(image_hash):
+            self._buckets[band].setdefault(key, []).append(image_hash)
+    
+    def contains_near(self, image_hash: int) -> bool:
+        """判断索引中是否存在与给定哈希相近的哈希"""
+        checked = set()
+        for band, key in self._bands(image_hash):
+            for candidate in self._buckets[band].get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if bin(image_hash ^ candidate).count('1') <= self.threshold:
+                    return True
+        return False
+    
+    def __len__(self) -> int:
+        return len(self._hashes)
+    
+    def __iter__(self):
+        return iter(self._hashes)
+
+
+class HostRateLimiter:
+    """
+    按主机划分的令牌桶限流器（线程安全）
+    
+    每个主机独立维护令牌桶，线程在锁内预留令牌、锁外等待，
+    不同主机之间互不阻塞
+    """
+    
+    def __init__(self, default_rate: float, burst: float = 1.0):
+        """
+        Args:
+            default_rate: 默认每秒请求数
+            burst: 令牌桶容量（允许的突发请求数）
+        """
+        self.default_rate = default_rate
+        self.burst = burst
+        self._rates: Dict[str, float] = {}
+        self._buckets: Dict[str, List[float]] = {}  # host -> [令牌数, 上次补充时间]
+        self._lock = threading.Lock()
+    
+    def set_rate(self, host: str, rate: float):
+        """为指定主机设置每秒请求数"""
+        with self._lock:
+            self._rates[host] = rate
+    
+    def acquire(self, url: str):
+        """
+        获取一个请求令牌，必要时阻塞等待
+        
+        Args:
+            url: 请求URL（按其主机名限流）
+        """
+        host = urlsplit(url).netloc
+        with self._lock:
+            rate = self._rates.get(host, self.default_rate)
+            now = time.monotonic()
+            bucket = self._buckets.setdefault(host, [self.burst, now])
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            bucket[0] -= 1
+            wait = -bucket[0] / rate if bucket[0] < 0 else 0
+        
+        if wait > 0:
+            time.sleep(wait)
+
 
 class ImageCrawler:
     """TMDB图片爬取器类"""
@@ -37,13 +174,15 @@ class ImageCrawler:
         self.images_dir = Path(self.storage_config.get('images_dir', './data/images'))
         self.images_dir.mkdir(parents=True, exist_ok=True)
         
-        # 创建session
-        self.session = requests.Session()
-        self.session.params = {'api_key': self.api_key}
-        
         # 下载配置
         self.download_timeout = 30
         self.concurrent_downloads = 3
+        self.concurrent_actors = 4  # 同时处理的演员数量
+        
+        # 创建session：API请求与图片下载分开，避免把api_key发送给图片CDN
+        self.session = self._create_session()
+        self.session.params = {'api_key': self.api_key}
+        self.download_session = self._create_session()
         
         # 图片尺寸选项（从大到小）
         self.image_sizes = ['original', 'w780', 'w500', 'w342', 'w185', 'w154', 'w92']
@@ -56,9 +195,49 @@ class ImageCrawler:
             'api_calls': 0
         }
         
-        # 请求限制：每秒最多40次请求
-        self.last_request_time = 0
-        self.min_request_interval = 0.025  # 25毫秒
+        # 请求限制：按主机令牌桶限流（多线程共享），API每秒最多40次请求
+        self.rate_limiter = HostRateLimiter(default_rate=20, burst=5)
+        self.rate_limiter.set_rate(urlsplit(self.base_url).netloc, 40)
+        self._stats_lock = threading.Lock()
+        
+        # 跨演员共享的感知哈希索引和图片标识，同一批次中合照等重复图片只保留一份；
+        # 只在batch_collect_images执行期间存在，单独调用collect_actor_images时为None
+        self._seen_hashes: Optional[PerceptualHashIndex] = None
+        self._seen_keys: Optional[Set[str]] = None
+        self._seen_lock = threading.Lock()
+        self._warmed_hosts = set()
+        
+        # TMDB API响应的磁盘缓存（重复运行时跳过已查询过的演员）
+        self._cache_lock = threading.Lock()
+        self._api_cache = sqlite3.connect(str(self.images_dir / API_CACHE_FILENAME), check_same_thread=False)
+        self._api_cache.execute('PRAGMA journal_mode=WAL')
+        self._api_cache.execute(
+            'CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, body BLOB, fetched_at REAL)'
+        )
+    
+    def _create_session(self) -> requests.Session:
+        """
+        创建带连接池和自动重试的session
+        
+        连接池大小按并发下载数设置，使各线程复用keep-alive连接
+        
+        Returns:
+            配置好的session
+        """
+        pool_size = max(32, self.concurrent_downloads * self.concurrent_actors * 2)
+        retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504],
+                      allowed_methods=['GET', 'HEAD'])
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=pool_size, max_retries=retry)
+        
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def _incr_stat(self, key: str):
+        """线程安全地累加统计计数"""
+        with self._stats_lock:
+            self.download_stats[key] += 1
     
     def _make_request(self, endpoint: str, params: Dict = None) -> Dict[str, Any]:
         """
@@ -71,21 +250,23 @@ class ImageCrawler:
         Returns:
             响应数据
         """
-        # 请求限流
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.min_request_interval:
-            time.sleep(self.min_request_interval - time_since_last)
-        
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        cache_key = f"{endpoint.lstrip('/')}?{sorted((params or {}).items())}"
+        
+        body = self._get_cached_response(cache_key)
+        if body is not None:
+            return self._parse_json(body)
+        
+        self.rate_limiter.acquire(url)
         
         try:
             response = self.session.get(url, params=params, timeout=self.download_timeout)
-            self.last_request_time = time.time()
-            self.download_stats['api_calls'] += 1
+            self._incr_stat('api_calls')
             
             response.raise_for_status()
-            return response.json()
+            data = self._parse_json(response.content)
+            self._put_cached_response(cache_key, response.content)
+            return data
             
         except requests.exceptions.RequestException as e:
             logger.error(f"TMDB API请求失败: {e}")
@@ -94,6 +275,54 @@ class ImageCrawler:
             logger.error(f"TMDB API响应解析失败: {e}")
             raise
     
+    @staticmethod
+    def _parse_json(body: bytes) -> Any:
+        """解析JSON响应体"""
+        if ORJSON_AVAILABLE:
+            return orjson.loads(body)
+        return json.loads(body)
+    
+    def _get_cached_response(self, key: str) -> Optional[bytes]:
+        """
+        读取未过期的缓存响应
+        
+        Args:
+            key: 缓存键
+            
+        Returns:
+            响应体，未命中或已过期时返回None
+        """
+        try:
+            with self._cache_lock:
+                row = self._api_cache.execute(
+                    'SELECT body, fetched_at FROM responses WHERE key = ?', (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.debug(f"读取API缓存失败: {e}")
+            return None
+        
+        if row is None or time.time() - row[1] > API_CACHE_TTL:
+            return None
+        return row[0]
+    
+    def _put_cached_response(self, key: str, body: bytes):
+        """
+        写入缓存响应
+        
+        Args:
+            key: 缓存键
+            body: 响应体
+        """
+        try:
+            with self._cache_lock:
+                with self._api_cache:
+                    self._api_cache.execute(
+                        'INSERT OR REPLACE INTO responses (key, body, fetched_at) VALUES (?, ?, ?)',
+                        (key, body, time.time())
+                    )
+        except sqlite3.Error as e:
+            logger.debug(f"写入API缓存失败: {e}")
+    
     def search_person(self, actor_name: str) -> List[Dict[str, Any]]:
         """
         搜索演员
@@ -176,7 +405,31 @@ class ImageCrawler:
             return ""
         return f"{self.image_base_url}{size}{image_path}"
     
-    def download_image(self, url: str, save_path: Path) -> bool:
+    def _warm_up_host(self, url: str):
+        """
+        在后台预先建立到图片主机的连接（DNS解析 + TLS握手）
+        
+        与TMDB API请求并行进行，下载开始时可直接复用连接池中的连接，
+        每个主机只预热一次
+        
+        Args:
+            url: 目标主机上的任意URL
+        """
+        parts = urlsplit(url)
+        with self._seen_lock:
+            if parts.netloc in self._warmed_hosts:
+                return
+            self._warmed_hosts.add(parts.netloc)
+        
+        def warm_up():
+            try:
+                self.download_session.head(f"{parts.scheme}://{parts.netloc}/", timeout=3)
+            except Exception as e:
+                logger.debug(f"预热连接失败 {parts.netloc}: {e}")
+        
+        threading.Thread(target=warm_up, daemon=True).start()
+    
+    def download_image(self, url: str, save_path: Path) -> Optional[Tuple[int, int]]:
         """
         下载单张图片
         
@@ -185,109 +438,336 @@ class ImageCrawler:
             save_path: 保存路径
             
         Returns:
-            是否下载成功
+            (下载的字节数, 图片感知哈希)，失败时返回None
         """
-        self.download_stats['total_attempts'] += 1
+        self._incr_stat('total_attempts')
         
         try:
-            response = requests.get(url, timeout=self.download_timeout, stream=True)
-            response.raise_for_status()
+            self.rate_limiter.acquire(url)
+            # 读取完毕即归还连接，校验和落盘在连接释放后进行
+            with self.download_session.get(url, timeout=self.download_timeout, stream=True) as response:
+                response.raise_for_status()
+                
+                # 检查内容类型
+                content_type = response.headers.get('content-type', '').lower()
+                if not any(img_type in content_type for img_type in ['image/', 'application/octet-stream']):
+                    logger.debug(f"内容类型不是图片: {content_type}")
+                    return None
+                
+                # 根据响应头提前拒绝过大的文件，避免写入后再删除
+                content_length = int(response.headers.get('Content-Length', 0) or 0)
+                if content_length > MAX_IMAGE_BYTES:
+                    logger.debug(f"图片文件过大 ({content_length} bytes)，跳过下载")
+                    self._incr_stat('failed_downloads')
+                    return None
+                
+                # 一次性读入内存，在内存中完成校验，通过后再落盘
+                response.raw.decode_content = True
+                data = response.raw.read(MAX_IMAGE_BYTES + 1)
+            total_size = len(data)
             
-            # 检查内容类型
-            content_type = response.headers.get('content-type', '').lower()
-            if not any(img_type in content_type for img_type in ['image/', 'application/octet-stream']):
-                logger.debug(f"内容类型不是图片: {content_type}")
-                return False
-            
-            # 下载图片
-            total_size = 0
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        total_size += len(chunk)
-                        
-                        # 防止下载过大的文件
-                        if total_size > 20 * 1024 * 1024:  # 20MB限制
-                            logger.debug(f"图片文件过大，中止下载")
-                            f.close()
-                            save_path.unlink(missing_ok=True)
-                            return False
-            
-            # 验证图片完整性
-            if self._validate_image(save_path):
-                logger.debug(f"成功下载图片: {save_path.name} ({total_size} bytes)")
-                self.download_stats['successful_downloads'] += 1
-                return True
-            else:
-                save_path.unlink(missing_ok=True)
-                logger.debug(f"图片验证失败，删除文件")
-                self.download_stats['failed_downloads'] += 1
-                return False
+            # 未提供Content-Length时的兜底检查
+            if total_size > MAX_IMAGE_BYTES:
+                logger.debug("图片文件过大，跳过")
+                self._incr_stat('failed_downloads')
+                return None
+            
+            image_hash = self._validate_image(data)
+            if image_hash is None:
+                logger.debug("图片验证失败，跳过")
+                self._incr_stat('failed_downloads')
+                return None
+            
+            save_path.write_bytes(data)
+            logger.debug(f"成功下载图片: {save_path.name} ({total_size} bytes)")
+            self._incr_stat('successful_downloads')
+            return total_size, image_hash
                 
         except Exception as e:
             logger.debug(f"下载图片失败: {e}")
-            self.download_stats['failed_downloads'] += 1
-            return False
+            self._incr_stat('failed_downloads')
+            return None
     
-    def _validate_image(self, image_path: Path) -> bool:
+    @staticmethod
+    def _has_image_header(header: bytes) -> bool:
+        """检查文件头是否为常见图片格式"""
+        return (header.startswith(b'\xff\xd8\xff') or  # JPEG
+                header.startswith(b'\x89PNG\r\n\x1a\n') or  # PNG
+                header.startswith(b'GIF87a') or header.startswith(b'GIF89a') or  # GIF
+                (header.startswith(b'RIFF') and header[8:12] == b'WEBP'))  # WebP
+    
+    def _validate_image(self, data: bytes) -> Optional[int]:
         """
-        验证图片文件的完整性
+        验证内存中图片数据的完整性，并计算用于去重的感知哈希
         
         Args:
-            image_path: 图片路径
+            data: 图片的原始字节
             
         Returns:
-            图片是否有效
+            图片的64位dHash，图片无效时返回None
         """
+        # 按代价从低到高逐级过滤，尽早拒绝无效图片
+        # 1. 数据大小  2. 文件头
+        if len(data) < MIN_IMAGE_BYTES or not self._has_image_header(data[:12]):
+            return None
+        
         try:
-            # 检查文件大小
-            if not image_path.exists() or image_path.stat().st_size < 1000:
-                return False
-            
-            # 尝试使用PIL验证
-            try:
-                from PIL import Image
-                with Image.open(image_path) as img:
-                    img.verify()
-                return True
-            except ImportError:
-                # 如果没有PIL，简单验证文件头
-                with open(image_path, 'rb') as f:
-                    header = f.read(10)
-                    # 检查常见图片格式的文件头
-                    return (header.startswith(b'\xff\xd8\xff') or  # JPEG
-                           header.startswith(b'\x89PNG\r\n\x1a\n') or  # PNG
-                           header.startswith(b'GIF87a') or header.startswith(b'GIF89a'))  # GIF
-            except:
-                return False
+            with Image.open(io.BytesIO(data)) as img:
+                # 3. 图片尺寸（只解析文件头，不解码像素）
+                width, height = img.size
+                if min(width, height) < MIN_IMAGE_DIMENSION or max(width, height) > MAX_IMAGE_DIMENSION:
+                    logger.debug(f"图片尺寸不符合要求: {width}x{height}")
+                    return None
+                
+                # 4. 缩小解码为灰度图并计算感知哈希，解码失败即视为图片损坏
+                thumbnail = self._thumbnail_from_image(img)
+            return self._compute_dhashes(thumbnail[np.newaxis])[0]
             
         except Exception:
-            return False
+            return None
+    
+    @staticmethod
+    def _thumbnail_from_image(img: Image.Image) -> np.ndarray:
+        """
+        将已打开的图片解码为用于计算dHash的8x9灰度缩略图
+        
+        Args:
+            img: PIL图片对象
+            
+        Returns:
+            形状为(8, 9)的uint8数组
+        """
+        img.draft('L', (64, 64))  # JPEG可直接按DCT缩放解码
+        return np.asarray(img.convert('L').resize((9, 8), Image.BILINEAR))
     
-    def _get_image_hash(self, image_path: Path) -> str:
+    @classmethod
+    def _load_thumbnail(cls, image_path: Path) -> np.ndarray:
         """
-        计算图片的哈希值用于去重
+        读取用于计算dHash的8x9灰度缩略图
         
         Args:
             image_path: 图片路径
             
         Returns:
-            图片哈希值
+            形状为(8, 9)的uint8数组
+        """
+        with Image.open(image_path) as img:
+            return cls._thumbnail_from_image(img)
+    
+    @staticmethod
+    def _compute_dhashes(thumbnails: np.ndarray) -> List[int]:
+        """
+        批量计算64位差值哈希（dHash）
+        
+        Args:
+            thumbnails: 形状为(N, 8, 9)的灰度缩略图
+            
+        Returns:
+            N个64位整数哈希
+        """
+        count = thumbnails.shape[0]
+        diff = thumbnails[:, :, 1:] > thumbnails[:, :, :-1]
+        packed = np.packbits(diff.reshape(count, 64), axis=1)
+        return packed.view('>u8').ravel().tolist()
+    
+    def _backfill_image_hashes(self, image_paths: List[Path]) -> List[int]:
+        """
+        为已存在的图片批量补算感知哈希
+        
+        Args:
+            image_paths: 图片路径列表
+            
+        Returns:
+            哈希列表
+        """
+        thumbnails = []
+        for path in image_paths:
+            try:
+                thumbnails.append(self._load_thumbnail(path))
+            except Exception as e:
+                logger.debug(f"读取已有图片失败 {path.name}: {e}")
+        
+        if not thumbnails:
+            return []
+        return self._compute_dhashes(np.stack(thumbnails))
+    
+    @staticmethod
+    def _get_file_key(file_path: str) -> str:
+        """
+        由TMDB的file_path生成稳定的文件标识
+        
+        Args:
+            file_path: TMDB图片路径，如 /abc123.jpg
+            
+        Returns:
+            文件标识，如 abc123
+        """
+        return Path(file_path.strip('/').replace('/', '_')).stem
+    
+    def _scan_existing_images(self, actor_dir: Path) -> Dict[str, Path]:
         """
+        扫描演员目录中已下载的图片，用于断点续爬
+        
+        Args:
+            actor_dir: 演员图片目录
+            
+        Returns:
+            文件标识到本地路径的映射
+        """
+        existing = {}
+        for path in actor_dir.glob('*.jpg'):
+            existing[path.stem.rsplit('_', 1)[-1]] = path
+        return existing
+    
+    def _load_image_hashes(self, actor_dir: Path) -> List[int]:
+        """加载演员目录中持久化的图片哈希"""
+        hashes_file = actor_dir / HASHES_FILENAME
+        if not hashes_file.exists():
+            return []
         try:
-            with open(image_path, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
+            return [int(h, 16) for h in hashes_file.read_text(encoding='utf-8').split() if len(h) == 16]
         except Exception as e:
-            logger.error(f"计算图片哈希失败: {e}")
-            return ""
+            logger.warning(f"读取图片哈希记录失败: {e}")
+            return []
+    
+    def _save_image_hashes(self, actor_dir: Path, image_hashes: Iterable[int]):
+        """持久化演员目录中的图片哈希"""
+        try:
+            (actor_dir / HASHES_FILENAME).write_text('\n'.join(f"{h:016x}" for h in image_hashes), encoding='utf-8')
+        except Exception as e:
+            logger.warning(f"保存图片哈希记录失败: {e}")
+    
+    def _load_actor_hashes(self, actor_dir: Path, existing_images: Dict[str, Path]) -> Tuple[List[int], bool]:
+        """
+        加载演员已下载图片的哈希，记录缺失时（如旧版本下载的图片）为已有图片批量补算
+        
+        Args:
+            actor_dir: 演员图片目录
+            existing_images: 已下载图片（文件标识到本地路径的映射）
+            
+        Returns:
+            (哈希列表, 是否进行了补算)
+        """
+        loaded_hashes = self._load_image_hashes(actor_dir)
+        if len(loaded_hashes) >= len(existing_images):
+            return loaded_hashes, False
+        return self._backfill_image_hashes(list(existing_images.values())), True
+    
+    def _load_skipped_keys(self, actor_dir: Path) -> Set[str]:
+        """加载演员目录中因重复而跳过的图片标识"""
+        skipped_file = actor_dir / SKIPPED_KEYS_FILENAME
+        if not skipped_file.exists():
+            return set()
+        try:
+            return set(skipped_file.read_text(encoding='utf-8').split())
+        except Exception as e:
+            logger.warning(f"读取跳过图片记录失败: {e}")
+            return set()
     
-    def get_actor_all_images_from_tmdb(self, person_id: int) -> List[Dict[str, Any]]:
+    def _save_skipped_keys(self, actor_dir: Path, skipped_keys: Set[str]):
+        """持久化演员目录中因重复而跳过的图片标识"""
+        try:
+            (actor_dir / SKIPPED_KEYS_FILENAME).write_text('\n'.join(sorted(skipped_keys)), encoding='utf-8')
+        except Exception as e:
+            logger.warning(f"保存跳过图片记录失败: {e}")
+    
+    def _get_actor_dir(self, actor_name: str, actor_id: int, movie_title: str = None) -> Path:
+        """
+        获取演员图片目录
+        
+        Args:
+            actor_name: 演员姓名
+            actor_id: 演员ID
+            movie_title: 电影名称（用于目录结构）
+            
+        Returns:
+            演员图片目录路径
+        """
+        if movie_title:
+            # 清理电影名称中的特殊字符
+            safe_movie_title = _UNSAFE_NAME_RE.sub('', movie_title).rstrip()
+            return self.images_dir / safe_movie_title / f"{actor_id}_{actor_name}"
+        return self.images_dir / "tmdb_actors" / f"{actor_id}_{actor_name}"
+    
+    def _resolve_actor_id(self, actor_name: str) -> Optional[int]:
+        """
+        按姓名搜索演员ID
+        
+        Args:
+            actor_name: 演员姓名
+            
+        Returns:
+            第一个匹配结果的演员ID，未找到时返回None
+        """
+        search_results = self.search_person(actor_name)
+        if not search_results:
+            logger.warning(f"未找到演员: {actor_name}")
+            return None
+        
+        # 选择第一个匹配结果
+        person = search_results[0]
+        popularity = person.get('popularity', 0)
+        logger.info(f"找到演员: {person['name']} (ID: {person['id']}, 人气度: {popularity:.1f})")
+        return person['id']
+    
+    def _seed_seen_images(self, actor_dirs: List[Path]):
+        """
+        按演员顺序用已下载的图片初始化批次内的去重索引
+        
+        在演员线程启动前单线程完成，重复图片总是归属于排在前面的演员，
+        结果不受线程调度影响
+        
+        Args:
+            actor_dirs: 按演员顺序排列的演员图片目录
+        """
+        seen_hashes = PerceptualHashIndex()
+        seen_keys = set()
+        for actor_dir in actor_dirs:
+            if not actor_dir.is_dir():
+                continue
+            existing_images = self._scan_existing_images(actor_dir)
+            loaded_hashes, backfilled = self._load_actor_hashes(actor_dir, existing_images)
+            if backfilled:
+                self._save_image_hashes(actor_dir, loaded_hashes)
+            
+            seen_keys.update(existing_images)
+            for image_hash in loaded_hashes:
+                if not seen_hashes.contains_near(image_hash):
+                    seen_hashes.add(image_hash)
+        
+        with self._seen_lock:
+            self._seen_hashes = seen_hashes
+            self._seen_keys = seen_keys
+    
+    def _select_size_preset(self, max_dimension: Optional[int]) -> Tuple[str, int]:
+        """
+        选择不小于目标边长的最小TMDB尺寸预设
+        
+        Args:
+            max_dimension: 目标最大边长，None表示使用原始尺寸
+            
+        Returns:
+            (尺寸预设, 预设宽度)，没有合适预设时返回 ('original', 0)
+        """
+        if not max_dimension:
+            return 'original', 0
+        
+        presets = sorted(
+            (int(size[1:]), size) for size in self.image_sizes if size.startswith('w')
+        )
+        for width, size in presets:
+            if width >= max_dimension:
+                return size, width
+        return 'original', 0
+    
+    def get_actor_all_images_from_tmdb(self, person_id: int, 
+                                       max_dimension: Optional[int] = 780) -> List[Dict[str, Any]]:
         """
         从TMDB获取演员的所有图片信息
         
         Args:
             person_id: 演员ID
+            max_dimension: 需要的最大边长，用于选择下载尺寸（None表示原始尺寸）
             
         Returns:
             图片信息列表
@@ -300,29 +780,43 @@ class ImageCrawler:
                 logger.info(f"演员 {person_id} 没有可用图片")
                 return []
             
-            # 为每张图片添加质量评分
-            enhanced_profiles = []
-            for profile in profiles:
-                width = profile.get('width', 0)
-                height = profile.get('height', 0)
-                vote_avg = profile.get('vote_average', 0)
-                vote_count = profile.get('vote_count', 0)
-                
-                # 计算综合质量评分
-                resolution_score = (width * height) / 1000000  # 百万像素
-                user_score = vote_avg * (1 + vote_count / 100)  # 评分权重
-                quality_score = resolution_score + user_score
-                
-                enhanced_profile = {
-                    **profile,
+            # 按列提取数值字段，向量化计算质量评分和下载尺寸
+            count = len(profiles)
+            widths = np.fromiter((p.get('width') or 0 for p in profiles), dtype=np.int64, count=count)
+            heights = np.fromiter((p.get('height') or 0 for p in profiles), dtype=np.int64, count=count)
+            vote_avgs = np.fromiter((p.get('vote_average') or 0 for p in profiles), dtype=np.float64, count=count)
+            vote_counts = np.fromiter((p.get('vote_count') or 0 for p in profiles), dtype=np.float64, count=count)
+            
+            # 计算综合质量评分
+            resolution_scores = (widths * heights) / 1000000  # 百万像素
+            user_scores = vote_avgs * (1 + vote_counts / 100)  # 评分权重
+            quality_scores = resolution_scores + user_scores
+            
+            # 选择下载尺寸：比目标尺寸大的图片直接请求CDN缩放好的版本
+            preset, preset_width = self._select_size_preset(max_dimension)
+            if preset_width:
+                download_sizes = np.where(widths > preset_width, preset, 'original')
+            else:
+                download_sizes = np.full(count, 'original')
+            
+            # 按质量评分排序，只在最后一步组装回字典
+            order = np.argsort(-quality_scores, kind='stable')
+            enhanced_profiles = [
+                {
+                    **profiles[i],
                     'quality_score': quality_score,
                     'resolution_score': resolution_score,
-                    'user_score': user_score
+                    'user_score': user_score,
+                    'download_size': download_size
                 }
-                enhanced_profiles.append(enhanced_profile)
-            
-            # 按质量评分排序
-            enhanced_profiles.sort(key=lambda x: x.get('quality_score', 0), reverse=True)
+                for i, quality_score, resolution_score, user_score, download_size in zip(
+                    order.tolist(),
+                    quality_scores[order].tolist(),
+                    resolution_scores[order].tolist(),
+                    user_scores[order].tolist(),
+                    download_sizes[order].tolist()
+                )
+            ]
             
             logger.info(f"从TMDB获取到演员 {person_id} 的 {len(enhanced_profiles)} 张图片")
             return enhanced_profiles
@@ -332,7 +826,7 @@ class ImageCrawler:
             return []
     
     def collect_actor_images(self, actor_name: str, actor_id: int = None, 
-                           movie_title: str = None) -> List[str]:
+                           movie_title: str = None, max_dimension: Optional[int] = 780) -> List[str]:
         """
         收集演员的所有TMDB图片
         
@@ -340,6 +834,7 @@ class ImageCrawler:
             actor_name: 演员姓名
             actor_id: 演员ID（可选）
             movie_title: 电影名称（用于目录结构）
+            max_dimension: 需要的最大边长，超过时下载TMDB缩放版本（None表示原始尺寸）
             
         Returns:
             成功下载的图片路径列表
@@ -348,42 +843,26 @@ class ImageCrawler:
         
         # 如果没有提供演员ID，先搜索
         if not actor_id:
-            search_results = self.search_person(actor_name)
-            if not search_results:
-                logger.warning(f"未找到演员: {actor_name}")
+            actor_id = self._resolve_actor_id(actor_name)
+            if not actor_id:
                 return []
-            
-            # 选择第一个匹配结果
-            person = search_results[0]
-            actor_id = person['id']
-            person_name = person['name']
-            popularity = person.get('popularity', 0)
-            
-            logger.info(f"找到演员: {person_name} (ID: {actor_id}, 人气度: {popularity:.1f})")
         
         # 创建目录结构
-        if movie_title:
-            # 清理电影名称中的特殊字符
-            safe_movie_title = "".join(c for c in movie_title if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            movie_dir = self.images_dir / safe_movie_title
-            movie_dir.mkdir(exist_ok=True)
-            actor_dir = movie_dir / f"{actor_id}_{actor_name}"
-        else:
-            actor_dir = self.images_dir / "tmdb_actors" / f"{actor_id}_{actor_name}"
-        
+        actor_dir = self._get_actor_dir(actor_name, actor_id, movie_title)
         actor_dir.mkdir(parents=True, exist_ok=True)
         
-        # 获取演员的所有图片
-        image_profiles = self.get_actor_all_images_from_tmdb(actor_id)
+        # 获取演员的所有图片（同时预热图片CDN连接）
+        self._warm_up_host(self.image_base_url)
+        image_profiles = self.get_actor_all_images_from_tmdb(actor_id, max_dimension)
         
         if not image_profiles:
             logger.warning(f"演员 {actor_name} 没有可用的TMDB图片")
             return []
         
         # 显示图片质量分析
-        logger.info(f"\n演员 {actor_name} 的图片质量分析:")
-        logger.info(f"{'序号':<4} {'尺寸':<12} {'比例':<8} {'评分':<6} {'投票数':<6} {'质量分':<8}")
-        logger.info("-" * 55)
+        logger.debug(f"\n演员 {actor_name} 的图片质量分析:")
+        logger.debug(f"{'序号':<4} {'尺寸':<12} {'比例':<8} {'评分':<6} {'投票数':<6} {'质量分':<8}")
+        logger.debug("-" * 55)
         
         for i, profile in enumerate(image_profiles, 1):
             width = profile.get('width', 0)
@@ -393,17 +872,32 @@ class ImageCrawler:
             vote_count = profile.get('vote_count', 0)
             quality_score = profile.get('quality_score', 0)
             
-            logger.info(f"{i:<4} {width}x{height:<6} {aspect_ratio:<8} {vote_average:<6} {vote_count:<6} {quality_score:<8.2f}")
+            logger.debug(f"{i:<4} {width}x{height:<6} {aspect_ratio:<8} {vote_average:<6} {vote_count:<6} {quality_score:<8.2f}")
         
         # 并发下载所有图片
         downloaded_paths = []
-        image_hashes = set()  # 用于去重
+        existing_images = self._scan_existing_images(actor_dir)
+        # 用于去重（跨运行持久化）
+        loaded_hashes, hashes_backfilled = self._load_actor_hashes(actor_dir, existing_images)
+        image_hashes = PerceptualHashIndex(loaded_hashes)
+        skipped_keys = self._load_skipped_keys(actor_dir)
+        new_skipped = 0
+        # 跨演员去重只在批量收集中进行（已有图片已在批次开始时按演员顺序登记）
+        with self._seen_lock:
+            seen_hashes, seen_keys = self._seen_hashes, self._seen_keys
+        cross_actor = seen_hashes is not None
+        total_size = 0
+        new_downloads = 0
+        skipped_existing = 0
+        skipped_duplicates = 0
         
         logger.info(f"\n开始下载演员 {actor_name} 的所有 {len(image_profiles)} 张图片...")
+        filename_prefix = f"{actor_name}_"
         
         with ThreadPoolExecutor(max_workers=self.concurrent_downloads) as executor:
             # 提交下载任务
             future_to_info = {}
+            seen_keys = set()
             
             for i, profile in enumerate(image_profiles, 1):
                 file_path = profile['file_path']
@@ -412,25 +906,48 @@ class ImageCrawler:
                 vote_average = profile.get('vote_average', 0)
                 quality_score = profile.get('quality_score', 0)
                 
-                # 选择合适的图片尺寸
-                if width >= 1500 and height >= 1500:
-                    size = 'w780'  # 超高分辨率用中等尺寸
-                elif width >= 1000 and height >= 1000:
-                    size = 'w500'  # 高分辨率用中等尺寸
-                elif width >= 500 and height >= 500:
-                    size = 'original'  # 中等分辨率用原始尺寸
+                # 同一file_path只处理一次（边提交边去重，保持质量排序）
+                file_key = self._get_file_key(file_path)
+                if file_key in seen_keys:
+                    continue
+                seen_keys.add(file_key)
+                
+                # 已下载过的图片直接复用，不再重复请求
+                if file_key in existing_images:
+                    downloaded_paths.append(str(existing_images[file_key]))
+                    skipped_existing += 1
+                    continue
+                
+                # 此前已判定与其他演员重复的图片不再请求
+                if file_key in skipped_keys:
+                    skipped_duplicates += 1
+                    continue
+                
+                # 同一批次中该图片已被其他演员下载时，下载前直接跳过
+                if cross_actor:
+                    with self._seen_lock:
+                        claimed = file_key in seen_keys
                 else:
-                    size = 'original'  # 小图片用原始尺寸
+                    claimed = False
+                if claimed:
+                    skipped_keys.add(file_key)
+                    new_skipped += 1
+                    skipped_duplicates += 1
+                    continue
+                
+                # 下载尺寸已在获取图片信息时统一计算
+                size = profile.get('download_size', 'original')
                 
                 # 构建URL和保存路径
                 image_url = self.get_full_image_url(file_path, size)
-                save_filename = f"{actor_name}_{i:03d}_{width}x{height}_score{quality_score:.1f}.jpg"
+                save_filename = f"{filename_prefix}{i:03d}_{width}x{height}_score{quality_score:.1f}_{file_key}.jpg"
                 save_path = actor_dir / save_filename
                 
                 future = executor.submit(self.download_image, image_url, save_path)
                 future_to_info[future] = {
                     'index': i,
                     'url': image_url,
+                    'file_key': file_key,
                     'save_path': save_path,
                     'dimensions': f"{width}x{height}",
                     'vote_average': vote_average,
@@ -442,24 +959,41 @@ class ImageCrawler:
             for future in as_completed(future_to_info):
                 info = future_to_info[future]
                 try:
-                    success = future.result()
+                    result = future.result()
                     
-                    if success and info['save_path'].exists():
-                        # 检查图片是否重复
-                        img_hash = self._get_image_hash(info['save_path'])
-                        if img_hash and img_hash not in image_hashes:
+                    if result is not None:
+                        file_size, img_hash = result
+                        # 检查图片是否重复（感知哈希可识别缩放/重新编码的相同图片），
+                        # 批量收集时同时对照本批次其他演员已下载的图片
+                        is_own_duplicate = image_hashes.contains_near(img_hash)
+                        is_duplicate = is_own_duplicate
+                        if cross_actor and not is_own_duplicate:
+                            with self._seen_lock:
+                                is_duplicate = seen_hashes.contains_near(img_hash)
+                                if not is_duplicate:
+                                    seen_hashes.add(img_hash)
+                                    seen_keys.add(info['file_key'])
+                        
+                        if not is_duplicate:
                             image_hashes.add(img_hash)
                             downloaded_paths.append(str(info['save_path']))
+                            total_size += file_size
+                            new_downloads += 1
                             
-                            file_size = info['save_path'].stat().st_size
-                            logger.info(f"  ✓ 下载 {info['index']}/{len(image_profiles)}: "
-                                      f"{info['dimensions']} (评分:{info['vote_average']:.1f}, "
-                                      f"质量分:{info['quality_score']:.1f}, 尺寸:{info['size_used']}, "
-                                      f"大小:{file_size} bytes)")
+                            logger.debug(f"  ✓ 下载 {info['index']}/{len(image_profiles)}: "
+                                       f"{info['dimensions']} (评分:{info['vote_average']:.1f}, "
+                                       f"质量分:{info['quality_score']:.1f}, 尺寸:{info['size_used']}, "
+                                       f"大小:{file_size} bytes)")
                         else:
                             # 删除重复图片
                             info['save_path'].unlink(missing_ok=True)
                             logger.debug(f"  - 删除重复图片: {info['save_path'].name}")
+                            skipped_duplicates += 1
+                            if not is_own_duplicate:
+                                # 与其他演员重复：记录哈希和图片标识，之后的运行不再下载
+                                image_hashes.add(img_hash)
+                                skipped_keys.add(info['file_key'])
+                                new_skipped += 1
                     else:
                         logger.warning(f"  ✗ 下载失败 {info['index']}/{len(image_profiles)}: "
                                      f"{info['dimensions']} - {info['url']}")
@@ -467,17 +1001,20 @@ class ImageCrawler:
                 except Exception as e:
                     logger.error(f"处理下载结果失败: {e}")
         
-                # 添加小延迟避免请求过快
-                time.sleep(0.1)
+        if new_downloads or hashes_backfilled or new_skipped:
+            self._save_image_hashes(actor_dir, image_hashes)
+        if new_skipped:
+            self._save_skipped_keys(actor_dir, skipped_keys)
         
         # 输出统计信息
         success_rate = (len(downloaded_paths) / len(image_profiles) * 100) if image_profiles else 0
-        total_size = sum(Path(path).stat().st_size for path in downloaded_paths)
-        avg_size = total_size / len(downloaded_paths) if downloaded_paths else 0
+        avg_size = total_size / new_downloads if new_downloads else 0
         
         logger.info(f"\n✅ 演员 {actor_name} 图片收集完成:")
         logger.info(f"   📊 TMDB可用: {len(image_profiles)} 张")
-        logger.info(f"   📥 成功下载: {len(downloaded_paths)} 张")
+        logger.info(f"   📥 成功下载: {new_downloads} 张")
+        logger.info(f"   ♻️ 已存在跳过: {skipped_existing} 张")
+        logger.info(f"   🔁 重复跳过: {skipped_duplicates} 张")
         logger.info(f"   📈 成功率: {success_rate:.1f}%")
         logger.info(f"   💾 总大小: {total_size / 1024 / 1024:.2f} MB")
         logger.info(f"   📏 平均大小: {avg_size / 1024:.1f} KB")
@@ -485,45 +1022,70 @@ class ImageCrawler:
         
         return downloaded_paths
     
-    def batch_collect_images(self, actors: List[Dict[str, Any]], movie_title: str = None) -> Dict[str, List[str]]:
+    def batch_collect_images(self, actors: List[Dict[str, Any]], movie_title: str = None,
+                             max_dimension: Optional[int] = 780) -> Dict[str, List[str]]:
         """
         批量收集多个演员的所有TMDB图片
         
         Args:
             actors: 演员信息列表
             movie_title: 电影名称
+            max_dimension: 需要的最大边长（None表示原始尺寸）
             
         Returns:
             演员名称到图片路径列表的映射
         """
         logger.info(f"开始批量收集 {len(actors)} 位演员的所有TMDB图片")
         
-        results = {}
-        total_images = 0
+        def resolve_one(actor: Dict[str, Any]) -> Optional[int]:
+            try:
+                return actor.get('id') or self._resolve_actor_id(actor['name'])
+            except Exception as e:
+                logger.error(f"搜索演员 {actor['name']} 失败: {e}")
+                return None
         
-        for i, actor in enumerate(actors, 1):
+        def collect_one(index: int, actor: Dict[str, Any], actor_id: Optional[int]) -> List[str]:
             actor_name = actor['name']
-            actor_id = actor.get('id')
-            
-            logger.info(f"\n处理演员 {i}/{len(actors)}: {actor_name}")
+            logger.info(f"\n处理演员 {index}/{len(actors)}: {actor_name}")
+            if not actor_id:
+                return []
             
             try:
                 image_paths = self.collect_actor_images(
                     actor_name=actor_name,
                     actor_id=actor_id,
-                    movie_title=movie_title
+                    movie_title=movie_title,
+                    max_dimension=max_dimension
                 )
-                results[actor_name] = image_paths
-                total_images += len(image_paths)
-                
                 logger.info(f"演员 {actor_name} 完成: {len(image_paths)} 张图片")
-                
-                # 添加延迟避免API请求过快
-                time.sleep(0.5)
+                return image_paths
                 
             except Exception as e:
                 logger.error(f"收集演员 {actor_name} 的图片失败: {e}")
-                results[actor_name] = []
+                return []
+        
+        # 多个演员并行处理，请求速率由按主机划分的共享限流器控制
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrent_actors) as executor:
+                actor_ids = list(executor.map(resolve_one, actors))
+                
+                # 每个批次（电影）单独去重，不同电影目录下的同一演员仍各自保留完整图片；
+                # 演员线程启动前按演员顺序登记已有图片，使重复图片的归属确定
+                self._seed_seen_images([
+                    self._get_actor_dir(actor['name'], actor_id, movie_title)
+                    for actor, actor_id in zip(actors, actor_ids) if actor_id
+                ])
+                
+                futures = [executor.submit(collect_one, i, actor, actor_id)
+                           for i, (actor, actor_id) in enumerate(zip(actors, actor_ids), 1)]
+                results = {actor['name']: future.result() for actor, future in zip(actors, futures)}
+        finally:
+            # 批次结束后清除去重状态，之后的单独调用或其他电影的批次不受影响
+            with self._seen_lock:
+                self._seen_hashes = None
+                self._seen_keys = None
+        
+        total_images = sum(len(paths) for paths in results.values())
         
         # 生成总结报告
         successful_actors = len([name for name, paths in results.items() if paths])
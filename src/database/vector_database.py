@@ -3,8 +3,15 @@
 支持Faiss和ChromaDB两种向量数据库
 """
 import os
+import sys
+import math
 import pickle
 import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
@@ -17,6 +24,13 @@ try:
 except ImportError:
     FAISS_AVAILABLE = False
 
+# orjson相关导入（可选，序列化速度更快）
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # ChromaDB相关导入
 try:
     import chromadb
@@ -30,6 +44,30 @@ from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 需要驻留的元数据字符串字段：同一电影/演员的所有人脸取值相同的字段，
+# 以及与id_to_idx的键共享同一对象的face_id
+INTERNED_METADATA_FIELDS = ('face_id', 'character', 'actor_name', 'actor_id', 'movie_title',
+                            'shape_type', 'color_hex')
+
+
+def intern_metadata(meta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    驻留元数据中的重复字符串，使相同取值共享同一个对象
+    
+    可减少内存占用，pickle保存时相同对象也只写出一次
+    
+    Args:
+        meta: 元数据字典（原地修改）
+        
+    Returns:
+        同一个元数据字典
+    """
+    for field in INTERNED_METADATA_FIELDS:
+        value = meta.get(field)
+        if type(value) is str:
+            meta[field] = sys.intern(value)
+    return meta
+
 
 class VectorDatabaseInterface(ABC):
     """向量数据库接口"""
@@ -68,14 +106,19 @@ class VectorDatabaseInterface(ABC):
 class FaissVectorDatabase(VectorDatabaseInterface):
     """Faiss向量数据库实现"""
     
-    def __init__(self, dimension: int = 512, index_type: str = "IVF", use_gpu: bool = False):
+    # Auto模式下由Flat切换为HNSW的向量数量
+    AUTO_HNSW_THRESHOLD = 10000
+    
+    def __init__(self, dimension: int = 512, index_type: str = "IVF", use_gpu: bool = False,
+                 use_mmap: bool = False):
         """
         初始化Faiss向量数据库
         
         Args:
             dimension: 向量维度
-            index_type: 索引类型 (Flat, IVF, HNSW)
+            index_type: 索引类型 (Flat, IVF, HNSW, IVFPQFastScan, SQ8, Auto)
             use_gpu: 是否使用GPU加速
+            use_mmap: 加载时是否以内存映射方式打开索引文件（只读，写入前自动完整加载）
         """
         if not FAISS_AVAILABLE:
             raise ImportError("Faiss未安装，请运行: pip install faiss-cpu 或 faiss-gpu")
@@ -83,11 +126,19 @@ class FaissVectorDatabase(VectorDatabaseInterface):
         self.dimension = dimension
         self.index_type = index_type
         self.use_gpu = use_gpu
+        self.use_mmap = use_mmap
+        self._index_mmapped = False
+        
+        # faiss的Python包会按CPU自动加载AVX512/AVX2优化版本（可用环境变量FAISS_OPT_LEVEL覆盖），
+        # 记录实际加载的SIMD级别，便于排查性能问题
+        if hasattr(faiss, 'get_compile_options'):
+            logger.debug(f"Faiss编译选项: {faiss.get_compile_options()}")
         
         # 初始化索引
         self.index = self._create_index()
         self.metadata = []  # 存储元数据
         self.id_to_idx = {}  # ID到索引的映射
+        self.deleted_indices = set()  # 已删除但尚未清理的索引位置（墓碑）
         
         # 配置文件路径
         storage_config = config.get_storage_config()
@@ -98,22 +149,42 @@ class FaissVectorDatabase(VectorDatabaseInterface):
         self.metadata_file = self.embeddings_dir / 'metadata.pkl'
         self.id_mapping_file = self.embeddings_dir / 'id_mapping.json'
     
-    def _create_index(self):
-        """创建Faiss索引"""
-        if self.index_type == "Flat":
-            # 精确搜索，适合小数据集
+    def _create_index(self, index_type: str = None, nlist: int = 100):
+        """
+        创建Faiss索引
+        
+        Args:
+            index_type: 索引类型，默认使用self.index_type
+            nlist: IVF类索引的聚类中心数量
+        """
+        index_type = index_type or self.index_type
+        if index_type in ("Flat", "Auto"):
+            # 精确搜索，适合小数据集（Auto模式在数据量增大后自动切换为HNSW）
             index = faiss.IndexFlatIP(self.dimension)  # 内积相似度
-        elif self.index_type == "IVF":
+        elif index_type == "IVF":
             # 倒排文件索引，适合大数据集
-            nlist = 100  # 聚类中心数量
             quantizer = faiss.IndexFlatIP(self.dimension)
-            index = faiss.IndexIVFFlat(quantizer, self.dimension, nlist)
-        elif self.index_type == "HNSW":
+            index = faiss.IndexIVFFlat(quantizer, self.dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.nprobe = self._ivf_nprobe(nlist)
+        elif index_type == "HNSW":
             # 分层导航小世界图，查询速度快
             M = 16  # 连接数
-            index = faiss.IndexHNSWFlat(self.dimension, M)
+            index = faiss.IndexHNSWFlat(self.dimension, M, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = 200
+            index.hnsw.efSearch = 64
+        elif index_type == "IVFPQFastScan":
+            # 倒排 + 4bit乘积量化，使用SIMD查表kernel，适合百万级以上数据
+            M = 64  # 子向量数量，需整除向量维度
+            quantizer = faiss.IndexFlatIP(self.dimension)
+            index = faiss.IndexIVFPQFastScan(quantizer, self.dimension, nlist, M, 4,
+                                             faiss.METRIC_INNER_PRODUCT)
+            index.nprobe = self._ivf_nprobe(nlist)
+        elif index_type == "SQ8":
+            # 每维8bit标量量化，内存为Flat的1/4，距离计算使用SIMD整数kernel
+            index = faiss.IndexScalarQuantizer(self.dimension, faiss.ScalarQuantizer.QT_8bit,
+                                               faiss.METRIC_INNER_PRODUCT)
         else:
-            logger.warning(f"未知索引类型 {self.index_type}，使用Flat索引")
+            logger.warning(f"未知索引类型 {index_type}，使用Flat索引")
             index = faiss.IndexFlatIP(self.dimension)
         
         # 如果启用GPU，将索引移到GPU上
@@ -140,20 +211,40 @@ class FaissVectorDatabase(VectorDatabaseInterface):
             if len(embeddings) != len(metadata):
                 raise ValueError("向量数量与元数据数量不匹配")
             
-            # 转换为numpy数组并归一化
-            embeddings_array = np.array(embeddings).astype('float32')
+            self._ensure_writable_index()
+            
+            # 转换为连续的float32矩阵（只拷贝一次，归一化是原地操作，不能修改调用方数据）
+            if isinstance(embeddings, np.ndarray):
+                embeddings_array = np.array(embeddings, dtype=np.float32, order='C')
+            else:
+                embeddings_array = np.empty((len(embeddings), self.dimension), dtype=np.float32)
+                for i, embedding in enumerate(embeddings):
+                    embeddings_array[i] = embedding
             
             # 归一化向量 (对于内积相似度)
             faiss.normalize_L2(embeddings_array)
             
-            # 如果是IVF索引且未训练，需要先训练
+            if self.index_type == "Auto":
+                self._upgrade_auto_index(embeddings_array.shape[0])
+            elif self.index_type in self.IVF_INDEX_TYPES:
+                self._upgrade_fallback_index(embeddings_array)
+            
+            # 如果是IVF/SQ8等需训练的索引且未训练，按首批数据量确定参数后训练
+            # （SQ8只需统计各维取值范围，任意非空数据都可训练，不回退为Flat）
             if hasattr(self.index, 'is_trained') and not self.index.is_trained:
-                if embeddings_array.shape[0] >= 100:  # 需要足够的数据进行训练
-                    logger.info("训练IVF索引...")
-                    self.index.train(embeddings_array)
+                count = embeddings_array.shape[0]
+                if count < self.IVF_MIN_TRAIN_VECTORS and self.index_type in self.IVF_INDEX_TYPES:
+                    logger.info(f"数据量较少 ({count})，暂用Flat索引代替{self.index_type}，"
+                                f"达到 {self.IVF_MIN_TRAIN_VECTORS} 个向量后自动切换")
+                    self.index = self._create_index("Flat")
                 else:
-                    logger.warning("数据量不足，无法训练IVF索引")
-                    return False
+                    nlist = self._ivf_nlist(count)
+                    self.index = self._create_index(nlist=nlist)
+                    if hasattr(self.index, 'nlist'):
+                        logger.info(f"训练{self.index_type}索引 (nlist={nlist}, nprobe={self._ivf_nprobe(nlist)})...")
+                    else:
+                        logger.info(f"训练{self.index_type}索引 ({count} 个向量)...")
+                    self.index.train(embeddings_array)
             
             # 记录当前索引大小
             start_idx = self.index.ntotal
@@ -163,6 +254,7 @@ class FaissVectorDatabase(VectorDatabaseInterface):
             
             # 添加元数据
             for i, meta in enumerate(metadata):
+                intern_metadata(meta)
                 face_id = meta.get('face_id', f"face_{start_idx + i}")
                 self.metadata.append(meta)
                 self.id_to_idx[face_id] = start_idx + i
@@ -174,103 +266,215 @@ class FaissVectorDatabase(VectorDatabaseInterface):
             logger.error(f"添加向量到Faiss失败: {e}")
             return False
     
-    def search_similar(self, query_embedding: np.ndarray, top_k: int = 10) -> List[Dict[str, Any]]:
+    # 训练数据少于该值时不训练IVF索引，暂用Flat精确搜索
+    IVF_MIN_TRAIN_VECTORS = 1000
+    # 需要训练聚类中心的索引类型
+    IVF_INDEX_TYPES = ("IVF", "IVFPQFastScan")
+    
+    @staticmethod
+    def _ivf_nlist(count: int) -> int:
+        """按数据量选择聚类中心数量（约4*sqrt(N)，使各倒排桶大小均衡）"""
+        return max(16, min(65536, int(4 * math.sqrt(count))))
+    
+    @staticmethod
+    def _ivf_nprobe(nlist: int) -> int:
+        """按聚类中心数量选择查询时探测的桶数"""
+        return max(1, int(math.sqrt(nlist)))
+    
+    def _upgrade_auto_index(self, incoming: int):
+        """
+        Auto模式下数据量超过阈值时，将Flat索引迁移为HNSW索引
+        
+        Args:
+            incoming: 即将添加的向量数量
+        """
+        if isinstance(self.index, faiss.IndexHNSW):
+            return
+        if self.index.ntotal + incoming < self.AUTO_HNSW_THRESHOLD:
+            return
+        
+        logger.info(f"向量数量达到 {self.AUTO_HNSW_THRESHOLD}，索引由Flat切换为HNSW")
+        existing = self.index.reconstruct_n(0, self.index.ntotal) if self.index.ntotal else None
+        self.index = self._create_index("HNSW")
+        if existing is not None:
+            self.index.add(existing)
+    
+    def _upgrade_fallback_index(self, embeddings: np.ndarray):
+        """
+        IVF类索引因数据量少暂用Flat索引时，累计数据量达到训练所需数量后迁移为原定索引
+        
+        Args:
+            embeddings: 即将添加的归一化向量
+        """
+        if hasattr(self.index, 'nlist'):
+            return
+        count = self.index.ntotal + embeddings.shape[0]
+        if count < self.IVF_MIN_TRAIN_VECTORS:
+            return
+        
+        existing = self.index.reconstruct_n(0, self.index.ntotal) if self.index.ntotal else None
+        nlist = self._ivf_nlist(count)
+        logger.info(f"向量数量达到 {self.IVF_MIN_TRAIN_VECTORS}，索引由Flat切换为{self.index_type} (nlist={nlist})")
+        self.index = self._create_index(nlist=nlist)
+        self.index.train(embeddings if existing is None else np.vstack([existing, embeddings]))
+        if existing is not None:
+            self.index.add(existing)
+    
+    def search_similar(self, query_embedding: np.ndarray, top_k: int = 10,
+                       min_similarity: float = None) -> List[Dict[str, Any]]:
         """搜索相似向量"""
+        results = self.search_similar_batch(query_embedding.reshape(1, -1), top_k, min_similarity)
+        return results[0] if results else []
+    
+    def search_similar_batch(self, query_embeddings: np.ndarray, top_k: int = 10,
+                             min_similarity: float = None) -> List[List[Dict[str, Any]]]:
+        """
+        批量搜索相似向量（一次归一化、一次索引调用，GPU索引下收益明显）
+        
+        Args:
+            query_embeddings: 形状为(B, dimension)的查询向量
+            top_k: 每个查询返回的结果数量
+            min_similarity: 最小相似度阈值，低于阈值的结果不组装元数据
+            
+        Returns:
+            每个查询对应的相似结果列表
+        """
         try:
             if self.index.ntotal == 0:
                 logger.warning("索引为空，无法搜索")
                 return []
             
-            # 归一化查询向量
-            query_vector = query_embedding.reshape(1, -1).astype('float32')
-            faiss.normalize_L2(query_vector)
+            # 归一化查询向量（拷贝后原地归一化，不修改调用方数据）
+            query_vectors = np.array(query_embeddings, dtype=np.float32, order='C').reshape(-1, self.dimension)
+            faiss.normalize_L2(query_vectors)
             
-            # 搜索
-            scores, indices = self.index.search(query_vector, min(top_k, self.index.ntotal))
+            # 搜索（多取墓碑数量的结果，保证过滤后仍有top_k个）
+            search_k = min(top_k + len(self.deleted_indices), self.index.ntotal)
+            scores, indices = self.index.search(query_vectors, search_k)
             
-            # 整理结果
-            results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if idx == -1:  # Faiss返回-1表示无效结果
-                    continue
-                
-                result = {
-                    'similarity': float(score),
-                    'metadata': self.metadata[idx] if idx < len(self.metadata) else {}
-                }
-                results.append(result)
+            # 用掩码一次性筛掉无效结果（Faiss返回-1）、已删除和低于阈值的结果，只为保留的结果组装元数据
+            valid = indices != -1
+            if self.deleted_indices:
+                valid &= ~np.isin(indices, np.fromiter(self.deleted_indices, dtype=np.int64))
+            if min_similarity is not None:
+                valid &= scores >= min_similarity
             
-            logger.debug(f"搜索到 {len(results)} 个相似结果")
-            return results
+            batch_results = []
+            metadata_count = len(self.metadata)
+            for row_valid, row_scores, row_indices in zip(valid, scores, indices):
+                batch_results.append([
+                    {
+                        'similarity': score,
+                        'metadata': self.metadata[idx] if idx < metadata_count else {}
+                    }
+                    for score, idx in zip(row_scores[row_valid][:top_k].tolist(),
+                                          row_indices[row_valid][:top_k].tolist())
+                ])
+            
+            logger.debug(f"批量搜索 {len(batch_results)} 个查询")
+            return batch_results
             
         except Exception as e:
             logger.error(f"Faiss搜索失败: {e}")
             return []
     
     def delete_by_id(self, face_id: str) -> bool:
-        """根据ID删除向量 (通过重建索引实现)"""
-        try:
-            if face_id not in self.id_to_idx:
-                logger.warning(f"未找到face_id: {face_id}")
-                return False
-            
-            # 获取要删除的索引
-            delete_idx = self.id_to_idx[face_id]
-            
-            # 收集保留的数据
-            keep_embeddings = []
-            keep_metadata = []
-            new_id_to_idx = {}
-            
-            # 遍历所有数据，保留除了要删除的之外的所有数据
-            for i, meta in enumerate(self.metadata):
-                if i != delete_idx:
-                    # 获取向量（需要重新构建）
-                    if i < self.index.ntotal:
-                        # Faiss不能直接获取单个向量，需要重建
-                        keep_metadata.append(meta)
-                        new_id_to_idx[meta.get('face_id', '')] = len(keep_metadata) - 1
-            
-            # 如果没有数据保留，创建空索引
-            if not keep_metadata:
-                self.index = self._create_index()
-                self.metadata = []
-                self.id_to_idx = {}
-                logger.info(f"删除face_id {face_id}，索引已清空")
-                return True
-            
-            # 重建索引（简化实现：标记删除，实际删除需要重建整个索引）
-            # 由于Faiss的限制，这里只删除metadata，向量索引保持不变
-            # 在搜索时会过滤掉已删除的条目
-            
-            # 从metadata中移除
-            self.metadata = [meta for i, meta in enumerate(self.metadata) if i != delete_idx]
-            
-            # 重建ID映射
-            self.id_to_idx = {}
-            for i, meta in enumerate(self.metadata):
-                self.id_to_idx[meta.get('face_id', '')] = i
-            
-            logger.info(f"成功删除face_id: {face_id}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"删除向量失败: {e}")
+        """
+        根据ID删除向量
+        
+        只在墓碑集合中标记索引位置，搜索时跳过；向量和元数据在compact()
+        （保存时自动调用）中一次性清理，连续删除多张人脸时不会反复重建
+        """
+        delete_idx = self.id_to_idx.pop(face_id, None)
+        if delete_idx is None:
+            logger.warning(f"未找到face_id: {face_id}")
             return False
+        
+        self.deleted_indices.add(delete_idx)
+        logger.info(f"成功删除face_id: {face_id}")
+        return True
+    
+    def delete_by_positions(self, positions: List[int]) -> int:
+        """
+        按索引位置批量标记删除（不依赖face_id，元数据中face_id缺失或重复时也能准确删除）
+        
+        与delete_by_id相同，只记录墓碑，向量和元数据在compact()中统一清理
+        
+        Args:
+            positions: 索引位置列表
+            
+        Returns:
+            新标记删除的数量
+        """
+        new_positions = set(positions) - self.deleted_indices
+        if not new_positions:
+            return 0
+        
+        self.deleted_indices |= new_positions
+        self.id_to_idx = {face_id: idx for face_id, idx in self.id_to_idx.items() if idx not in new_positions}
+        return len(new_positions)
+    
+    def compact(self):
+        """清理已标记删除的向量和元数据，重建索引使位置与元数据一一对应"""
+        if not self.deleted_indices:
+            return
+        
+        ntotal = self.index.ntotal
+        keep = np.setdiff1d(np.arange(len(self.metadata)), np.fromiter(self.deleted_indices, dtype=np.int64))
+        keep_vectors = keep[keep < ntotal]
+        
+        # 复制原索引后清空，IVF等索引可保留已训练的聚类中心
+        try:
+            new_index = faiss.clone_index(self.index)
+            new_index.reset()
+        except Exception:
+            new_index = self._create_index()
+        
+        if len(keep_vectors):
+            if hasattr(self.index, 'make_direct_map'):
+                self.index.make_direct_map()  # IVF索引按位置取回向量需要直接映射
+            vectors = self.index.reconstruct_n(0, ntotal)[keep_vectors]
+            if hasattr(new_index, 'is_trained') and not new_index.is_trained:
+                new_index.train(vectors)
+            new_index.add(vectors)
+        
+        # 旧位置到新位置的映射
+        new_positions = np.full(max(len(self.metadata), ntotal), -1, dtype=np.int64)
+        new_positions[keep] = np.arange(len(keep))
+        new_positions = new_positions.tolist()
+        
+        self.index = new_index
+        self._index_mmapped = False
+        self.metadata = [self.metadata[i] for i in keep.tolist()]
+        self.id_to_idx = {
+            face_id: new_positions[idx]
+            for face_id, idx in self.id_to_idx.items()
+            if idx < len(new_positions) and new_positions[idx] >= 0
+        }
+        
+        logger.info(f"清理 {len(self.deleted_indices)} 个已删除向量，剩余 {self.index.ntotal} 个")
+        self.deleted_indices = set()
     
     def save(self) -> bool:
         """保存数据库"""
         try:
-            # 保存索引
-            faiss.write_index(self.index, str(self.index_file))
+            self.compact()
+            
+            # 保存索引（写临时文件后替换，内存映射中的旧文件不会被截断）
+            tmp_index_file = self.index_file.with_name(self.index_file.name + '.tmp')
+            faiss.write_index(self.index, str(tmp_index_file))
+            os.replace(tmp_index_file, self.index_file)
             
-            # 保存元数据
-            with open(self.metadata_file, 'wb') as f:
-                pickle.dump(self.metadata, f)
+            # 保存元数据（使用最高版本的pickle协议，序列化速度更快）
+            self._write_atomic(self.metadata_file,
+                               lambda f: pickle.dump(self.metadata, f, protocol=pickle.HIGHEST_PROTOCOL))
             
             # 保存ID映射
-            with open(self.id_mapping_file, 'w', encoding='utf-8') as f:
-                json.dump(self.id_to_idx, f, ensure_ascii=False, indent=2)
+            if ORJSON_AVAILABLE:
+                id_mapping_bytes = orjson.dumps(self.id_to_idx, option=orjson.OPT_INDENT_2)
+            else:
+                id_mapping_bytes = json.dumps(self.id_to_idx, ensure_ascii=False, indent=2).encode('utf-8')
+            self._write_atomic(self.id_mapping_file, lambda f: f.write(id_mapping_bytes))
             
             logger.info(f"Faiss数据库已保存到 {self.embeddings_dir}")
             return True
@@ -279,6 +483,47 @@ class FaissVectorDatabase(VectorDatabaseInterface):
             logger.error(f"保存Faiss数据库失败: {e}")
             return False
     
+    @staticmethod
+    def _write_atomic(path: Path, write_func):
+        """
+        先写入临时文件并落盘，再替换目标文件，避免保存中断导致文件损坏
+        
+        Args:
+            path: 目标文件路径
+            write_func: 接收二进制文件对象的写入函数
+        """
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            write_func(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    
+    def _read_index(self):
+        """
+        读取索引文件，启用内存映射时由操作系统按需调页，启动快且只占用热点数据内存
+        
+        Returns:
+            Faiss索引
+        """
+        self._index_mmapped = False
+        if self.use_mmap:
+            try:
+                index = faiss.read_index(str(self.index_file), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                self._index_mmapped = True
+                logger.info("以内存映射方式加载Faiss索引")
+                return index
+            except Exception as e:
+                logger.warning(f"该索引不支持内存映射加载，改为完整读取: {e}")
+        return faiss.read_index(str(self.index_file))
+    
+    def _ensure_writable_index(self):
+        """内存映射的索引为只读，写入前完整加载到内存"""
+        if self._index_mmapped:
+            logger.info("索引即将被修改，完整加载内存映射的Faiss索引")
+            self.index = faiss.read_index(str(self.index_file))
+            self._index_mmapped = False
+    
     def load(self) -> bool:
         """加载数据库"""
         try:
@@ -287,17 +532,22 @@ class FaissVectorDatabase(VectorDatabaseInterface):
                 return True
             
             # 加载索引
-            self.index = faiss.read_index(str(self.index_file))
+            self.index = self._read_index()
+            self.deleted_indices = set()
             
             # 加载元数据
             if self.metadata_file.exists():
                 with open(self.metadata_file, 'rb') as f:
                     self.metadata = pickle.load(f)
+                for meta in self.metadata:
+                    intern_metadata(meta)
             
             # 加载ID映射
             if self.id_mapping_file.exists():
-                with open(self.id_mapping_file, 'r', encoding='utf-8') as f:
-                    self.id_to_idx = json.load(f)
+                with open(self.id_mapping_file, 'rb') as f:
+                    data = f.read()
+                id_mapping = orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+                self.id_to_idx = {sys.intern(face_id): idx for face_id, idx in id_mapping.items()}
             
             logger.info(f"成功加载Faiss数据库，包含 {self.index.ntotal} 个向量")
             return True
@@ -311,10 +561,13 @@ class FaissVectorDatabase(VectorDatabaseInterface):
         return {
             'database_type': 'Faiss',
             'index_type': self.index_type,
+            'index_class': type(self.index).__name__,  # 实际使用的索引（数据量少时可能为Flat）
             'dimension': self.dimension,
-            'total_vectors': self.index.ntotal,
+            'total_vectors': self.index.ntotal - len(self.deleted_indices),
             'metadata_count': len(self.metadata),
-            'is_trained': getattr(self.index, 'is_trained', True)
+            'is_trained': getattr(self.index, 'is_trained', True),
+            'nlist': getattr(self.index, 'nlist', None),
+            'nprobe': getattr(self.index, 'nprobe', None)
         }
 
 
@@ -357,35 +610,23 @@ class ChromaVectorDatabase(VectorDatabaseInterface):
             if len(embeddings) != len(metadata):
                 raise ValueError("向量数量与元数据数量不匹配")
             
-            # 准备数据
-            ids = []
-            embeddings_list = []
-            metadatas = []
-            documents = []
+            # 准备数据（向量整体转为float32矩阵后一次性转换为列表）
+            embeddings_list = np.asarray(embeddings, dtype=np.float32).tolist()
+            ids = [meta.get('face_id', f"face_{i}_{hash(str(meta)) % 10000}") for i, meta in enumerate(metadata)]
             
-            for i, (embedding, meta) in enumerate(zip(embeddings, metadata)):
-                face_id = meta.get('face_id', f"face_{i}_{hash(str(meta)) % 10000}")
-                ids.append(face_id)
-                embeddings_list.append(embedding.tolist())
-                
-                # ChromaDB元数据只支持基本类型
-                clean_meta = {}
-                for k, v in meta.items():
-                    if isinstance(v, (str, int, float, bool)):
-                        clean_meta[k] = v
-                    elif isinstance(v, (list, np.ndarray)):
-                        clean_meta[k] = str(v)  # 转为字符串
-                    else:
-                        clean_meta[k] = str(v)
-                
-                metadatas.append(clean_meta)
-                
-                # 创建文档内容用于全文搜索（以角色为主）
-                character = meta.get('character', meta.get('actor_name', 'Unknown'))
-                movie = meta.get('movie_title', 'Unknown Movie')
-                actor = meta.get('actor_name', 'Unknown Actor')
-                doc = f"Movie: {movie} Character: {character} Actor: {actor} Face ID: {face_id}"
-                documents.append(doc)
+            # ChromaDB元数据只支持基本类型，其余类型转为字符串
+            metadatas = [
+                {k: v if isinstance(v, (str, int, float, bool)) else str(v) for k, v in meta.items()}
+                for meta in metadata
+            ]
+            
+            # 创建文档内容用于全文搜索（以角色为主）
+            documents = [
+                f"Movie: {meta.get('movie_title', 'Unknown Movie')} "
+                f"Character: {meta.get('character', meta.get('actor_name', 'Unknown'))} "
+                f"Actor: {meta.get('actor_name', 'Unknown Actor')} Face ID: {face_id}"
+                for meta, face_id in zip(metadata, ids)
+            ]
             
             # 添加到集合
             self.collection.add(
@@ -404,28 +645,42 @@ class ChromaVectorDatabase(VectorDatabaseInterface):
     
     def search_similar(self, query_embedding: np.ndarray, top_k: int = 10) -> List[Dict[str, Any]]:
         """搜索相似向量"""
+        results = self.search_similar_batch(query_embedding.reshape(1, -1), top_k)
+        return results[0] if results else []
+    
+    def search_similar_batch(self, query_embeddings: np.ndarray, top_k: int = 10) -> List[List[Dict[str, Any]]]:
+        """
+        批量搜索相似向量（多个查询合并为一次collection.query调用）
+        
+        Args:
+            query_embeddings: 形状为(B, dimension)的查询向量
+            top_k: 每个查询返回的结果数量
+            
+        Returns:
+            每个查询对应的相似结果列表
+        """
         try:
             # 查询
             results = self.collection.query(
-                query_embeddings=[query_embedding.tolist()],
+                query_embeddings=np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1).tolist(),
                 n_results=top_k
             )
             
             # 整理结果
-            search_results = []
+            batch_results = []
             if results['metadatas'] and results['distances']:
-                for metadata, distance in zip(results['metadatas'][0], results['distances'][0]):
+                for row_metadatas, row_distances in zip(results['metadatas'], results['distances']):
                     # ChromaDB返回距离，转换为相似度
-                    similarity = 1.0 / (1.0 + distance)
-                    
-                    result = {
-                        'similarity': similarity,
-                        'metadata': metadata
-                    }
-                    search_results.append(result)
+                    batch_results.append([
+                        {
+                            'similarity': 1.0 / (1.0 + distance),
+                            'metadata': metadata
+                        }
+                        for metadata, distance in zip(row_metadatas, row_distances)
+                    ])
             
-            logger.debug(f"搜索到 {len(search_results)} 个相似结果")
-            return search_results
+            logger.debug(f"批量搜索 {len(batch_results)} 个查询")
+            return batch_results
             
         except Exception as e:
             logger.error(f"ChromaDB搜索失败: {e}")
@@ -467,6 +722,75 @@ class ChromaVectorDatabase(VectorDatabaseInterface):
             return {'database_type': 'ChromaDB', 'error': str(e)}
 
 
+class QueryCache:
+    """
+    相似度查询结果的LRU缓存（线程安全）
+    
+    以查询向量字节的哈希为键，命中时直接返回上次的搜索结果，
+    数据库内容变化时需调用invalidate_all清空
+    """
+    
+    def __init__(self, max_size: int = 2000, ttl: float = 300):
+        """
+        Args:
+            max_size: 最大缓存条目数
+            ttl: 缓存有效期（秒）
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (写入时间, 结果)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def make_key(query_embedding: np.ndarray, *params) -> tuple:
+        """由查询向量和查询参数生成缓存键"""
+        digest = hashlib.blake2b(np.ascontiguousarray(query_embedding).tobytes(), digest_size=16).hexdigest()
+        return (digest,) + params
+    
+    def get(self, key: tuple) -> Optional[List[Dict[str, Any]]]:
+        """读取缓存，未命中或过期时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key: tuple, results: List[Dict[str, Any]]):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate_all(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+
 class VectorDatabaseManager:
     """向量数据库管理器"""
     
@@ -480,7 +804,9 @@ class VectorDatabaseManager:
             dimension = self.vector_config.get('dimension', 512)
             index_type = self.vector_config.get('index_type', 'IVF')
             use_gpu = self.vector_config.get('use_gpu', False)
-            self.database = FaissVectorDatabase(dimension=dimension, index_type=index_type, use_gpu=use_gpu)
+            use_mmap = self.vector_config.get('mmap', False)
+            self.database = FaissVectorDatabase(dimension=dimension, index_type=index_type, use_gpu=use_gpu,
+                                                use_mmap=use_mmap)
         elif self.db_type == 'chromadb':
             collection_name = self.vector_config.get('chromadb', {}).get('collection_name', 'actor_faces')
             self.database = ChromaVectorDatabase(collection_name=collection_name)
@@ -490,6 +816,13 @@ class VectorDatabaseManager:
         # 加载现有数据
         self.database.load()
         
+        # 查询结果缓存（小规模Flat索引本身足够快，不使用缓存）
+        self.query_cache = QueryCache()
+        
+        # 后台保存：单线程执行器保证保存按顺序进行，修改数据库前先等待上一次保存完成
+        self._save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='vector-db-save')
+        self._save_future = None
+        
         logger.info(f"向量数据库管理器初始化完成，使用 {self.db_type.upper()}")
     
     def add_face_embeddings(self, faces_data: List[Dict[str, Any]]) -> bool:
@@ -540,11 +873,15 @@ class VectorDatabaseManager:
                 logger.warning("没有有效的嵌入向量可添加")
                 return False
             
+            self._wait_for_pending_save()
+            self.query_cache.invalidate_all()
             success = self.database.add_embeddings(embeddings, metadata)
             
             if success:
-                # 保存数据库
-                self.database.save()
+                # 在后台保存数据库，调用方可以继续处理下一批人脸
+                if isinstance(self.database, FaissVectorDatabase):
+                    self.database.compact()  # 重建索引需在前台完成，后台只做只读的写盘
+                self._save_future = self._save_executor.submit(self.database.save)
                 logger.info(f"成功添加 {len(embeddings)} 个人脸嵌入向量")
             
             return success
@@ -567,13 +904,28 @@ class VectorDatabaseManager:
             相似人脸列表
         """
         try:
-            results = self.database.search_similar(query_embedding, top_k)
+            use_cache = self._should_use_query_cache()
+            if use_cache:
+                cache_key = QueryCache.make_key(query_embedding, top_k, round(min_similarity, 3),
+                                                self._database_generation())
+                cached_results = self.query_cache.get(cache_key)
+                if cached_results is not None:
+                    return list(cached_results)
             
-            # 过滤低相似度结果
-            filtered_results = [
-                result for result in results 
-                if result['similarity'] >= min_similarity
-            ]
+            if isinstance(self.database, FaissVectorDatabase):
+                # 阈值直接下推到Faiss结果筛选
+                filtered_results = self.database.search_similar(query_embedding, top_k, min_similarity)
+            else:
+                results = self.database.search_similar(query_embedding, top_k)
+                
+                # 过滤低相似度结果
+                filtered_results = [
+                    result for result in results 
+                    if result['similarity'] >= min_similarity
+                ]
+            
+            if use_cache:
+                self.query_cache.put(cache_key, list(filtered_results))
             
             logger.info(f"搜索到 {len(filtered_results)} 个相似人脸 (阈值: {min_similarity})")
             return filtered_results
@@ -582,17 +934,96 @@ class VectorDatabaseManager:
             logger.error(f"搜索相似人脸失败: {e}")
             return []
     
+    def search_similar_faces_batch(self, query_embeddings: np.ndarray,
+                                   top_k: int = 10, min_similarity: float = 0.6) -> List[List[Dict[str, Any]]]:
+        """
+        批量搜索相似人脸
+        
+        Args:
+            query_embeddings: 形状为(B, dimension)的查询向量
+            top_k: 每个查询返回的结果数量
+            min_similarity: 最小相似度阈值
+            
+        Returns:
+            每个查询对应的相似人脸列表
+        """
+        try:
+            if isinstance(self.database, FaissVectorDatabase):
+                return self.database.search_similar_batch(query_embeddings, top_k, min_similarity)
+            
+            return [
+                [result for result in results if result['similarity'] >= min_similarity]
+                for results in self.database.search_similar_batch(query_embeddings, top_k)
+            ]
+            
+        except Exception as e:
+            logger.error(f"批量搜索相似人脸失败: {e}")
+            return []
+    
+    # 向量数量低于该值的Flat索引不使用查询缓存
+    QUERY_CACHE_MIN_VECTORS = 5000
+    
+    def _should_use_query_cache(self) -> bool:
+        """判断当前数据库是否值得使用查询缓存"""
+        if isinstance(self.database, FaissVectorDatabase) and self.database.index_type == "Flat":
+            return self.database.index.ntotal >= self.QUERY_CACHE_MIN_VECTORS
+        return True
+    
+    def _database_generation(self) -> tuple:
+        """
+        数据库状态标识，外部直接替换或修改数据库时使旧缓存自动失效
+        """
+        index = getattr(self.database, 'index', None)
+        return (id(self.database), id(index), getattr(index, 'ntotal', 0),
+                len(getattr(self.database, 'metadata', ())))
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取查询缓存统计信息"""
+        return self.query_cache.get_stats()
+    
     def get_database_stats(self) -> Dict[str, Any]:
         """获取数据库统计信息"""
         return self.database.get_stats()
     
+    def _wait_for_pending_save(self):
+        """等待后台保存完成（保存期间不能修改数据库）"""
+        if self._save_future is not None:
+            self._save_future.result()
+            self._save_future = None
+    
     def save_database(self) -> bool:
         """保存数据库"""
+        self._wait_for_pending_save()
         return self.database.save()
     
+    def close(self):
+        """等待后台保存完成并关闭保存线程"""
+        self._wait_for_pending_save()
+        self._save_executor.shutdown(wait=True)
+    
     def delete_face(self, face_id: str) -> bool:
         """删除人脸数据"""
-        return self.database.delete_by_id(face_id)
+        return self.delete_faces([face_id]) == 1
+    
+    def delete_faces(self, face_ids: List[str]) -> int:
+        """
+        批量删除人脸数据
+        
+        逐个标记删除后统一清理一次，使database.metadata等直接遍历元数据的调用方
+        立即看不到已删除的人脸，同时避免每删除一张就重建一次索引
+        
+        Args:
+            face_ids: 人脸ID列表
+            
+        Returns:
+            成功删除的数量
+        """
+        self._wait_for_pending_save()
+        self.query_cache.invalidate_all()
+        deleted_count = sum(1 for face_id in face_ids if self.database.delete_by_id(face_id))
+        if deleted_count and isinstance(self.database, FaissVectorDatabase):
+            self.database.compact()
+        return deleted_count
     
     def delete_movie_data(self, movie_title: str) -> Dict[str, Any]:
         """
@@ -605,28 +1036,23 @@ class VectorDatabaseManager:
             删除统计信息
         """
         try:
-            deleted_faces = 0
+            self._wait_for_pending_save()
+            self.query_cache.invalidate_all()
+            if isinstance(self.database, FaissVectorDatabase):
+                # 先清理待删除条目，保证元数据位置与索引向量一一对应
+                self.database.compact()
+            
+            # 找到目标电影的数据
+            delete_positions = []
             deleted_actors = set()
-            keep_metadata = []
-            keep_embeddings = []
-            
-            # 找到要保留的数据
-            if hasattr(self.database, 'metadata'):
-                for i, meta in enumerate(self.database.metadata):
-                    meta_movie = meta.get('movie_title', '').strip()
-                    
-                    if meta_movie.lower() != movie_title.lower():
-                        # 保留非目标电影的数据
-                        keep_metadata.append(meta)
-                        if hasattr(self.database, 'index') and i < self.database.index.ntotal:
-                            # 获取对应的向量数据（这里简化处理，实际上faiss需要重建）
-                            keep_embeddings.append(i)
-                    else:
-                        # 记录被删除的数据
-                        deleted_faces += 1
-                        actor_name = meta.get('actor_name', '')
-                        if actor_name:
-                            deleted_actors.add(actor_name)
+            for i, meta in enumerate(getattr(self.database, 'metadata', ())):
+                meta_movie = meta.get('movie_title', '').strip()
+                if meta_movie.lower() == movie_title.lower():
+                    delete_positions.append(i)
+                    actor_name = meta.get('actor_name', '')
+                    if actor_name:
+                        deleted_actors.add(actor_name)
+            deleted_faces = len(delete_positions)
             
             if deleted_faces == 0:
                 logger.warning(f"未找到电影 '{movie_title}' 的数据")
@@ -637,52 +1063,11 @@ class VectorDatabaseManager:
                     'found': False
                 }
             
-            # 重建数据库（由于faiss的限制，需要重新创建索引）
-            if keep_metadata:
-                logger.info(f"开始重建向量索引，保留 {len(keep_metadata)} 条记录")
-                
-                # 获取要保留的向量数据
-                keep_embeddings = []
-                keep_indices = []
-                
-                # 从原始索引中提取要保留的向量
-                for i, meta in enumerate(self.database.metadata):
-                    meta_movie = meta.get('movie_title', '').strip()
-                    if meta_movie.lower() != movie_title.lower():
-                        # 保留非目标电影的向量
-                        if i < self.database.index.ntotal:
-                            # 从Faiss索引中获取向量
-                            vector = self.database.index.reconstruct(i)
-                            keep_embeddings.append(vector)
-                            keep_indices.append(i)
-                
-                # 创建新的索引并添加保留的向量
-                new_index = self.database._create_index()
-                if keep_embeddings:
-                    import numpy as np
-                    embeddings_array = np.array(keep_embeddings).astype('float32')
-                    new_index.add(embeddings_array)
-                    logger.info(f"重建索引完成，添加了 {len(keep_embeddings)} 个向量")
-                
-                # 重建ID映射
-                new_id_to_idx = {}
-                for i, meta in enumerate(keep_metadata):
-                    face_id = meta.get('face_id', '')
-                    if face_id:
-                        new_id_to_idx[face_id] = i
-                
-                # 更新数据库
-                self.database.index = new_index
-                self.database.metadata = keep_metadata
-                self.database.id_to_idx = new_id_to_idx
-                
-                logger.info(f"数据库重建完成: {len(keep_metadata)} 条元数据, {new_index.ntotal} 个向量")
-            else:
-                # 如果没有数据保留，创建空索引
-                self.database.index = self.database._create_index()
-                self.database.metadata = []
-                self.database.id_to_idx = {}
-                logger.info("创建空数据库")
+            # 标记删除后统一清理：compact()会按索引类型取回保留的向量，
+            # 并在需要时训练新索引（IVF/SQ8等），保证元数据与向量重新对齐
+            self.database.delete_by_positions(delete_positions)
+            self.database.compact()
+            logger.info(f"数据库重建完成: {len(self.database.metadata)} 条元数据, {self.database.index.ntotal} 个向量")
             
             # 保存更新后的数据库
             self.save_database()
@@ -2,53 +2,132 @@
 人脸处理模块
 使用InsightFace进行人脸检测、对齐和特征提取
 """
+import math
 import cv2
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 import insightface
 from insightface.app import FaceAnalysis
+from insightface.app.common import Face
 from insightface.data import get_image as ins_get_image
+from insightface.utils import face_align
 
+try:
+    import onnxruntime
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+from .nms import nms, NUMBA_AVAILABLE
 from ..utils.config_loader import config
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# CUDAExecutionProvider调优参数：卷积算法穷举搜索、按需扩展显存池、允许cuDNN使用最大工作区
+CUDA_PROVIDER_OPTIONS = {
+    'cudnn_conv_algo_search': 'EXHAUSTIVE',
+    'arena_extend_strategy': 'kSameAsRequested',
+    'do_copy_in_default_stream': '1',
+    'cudnn_conv_use_max_workspace': '1',
+}
+
+
+def _cuda_warp_available() -> bool:
+    """检查OpenCV是否带CUDA模块且有可用设备"""
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):
+        return False
+
+
+# 标准人脸关键点位置 (112x112)
+ARCFACE_SRC_112 = np.array([
+    [30.2946, 51.6963],  # 左眼
+    [65.5318, 51.5014],  # 右眼
+    [48.0252, 71.7366],  # 鼻尖
+    [33.5493, 92.3655],  # 左嘴角
+    [62.7299, 92.2041]   # 右嘴角
+], dtype=np.float64)
+ARCFACE_SRC_112.setflags(write=False)
+
 
 class FaceProcessor:
     """人脸处理器类"""
     
+    # 批量处理时图片读取/保存的后台线程数
+    IMAGE_READ_WORKERS = 4
+    IMAGE_WRITE_WORKERS = 2
+    # 按输出尺寸缓存的标准关键点模板
+    _SRC_TEMPLATES: Dict[Tuple[int, int], np.ndarray] = {}
+    
     def __init__(self):
         """初始化人脸处理器"""
         self.face_config = config.get_face_recognition_config()
         
         self.model_name = self.face_config.get('model_name', 'buffalo_l')
         self.detection_threshold = self.face_config.get('detection_threshold', 0.6)
+        self.det_size = tuple(self.face_config.get('det_size', (640, 640)))
         self.embedding_dim = self.face_config.get('embedding_dim', 512)
         self.face_alignment = self.face_config.get('face_alignment', True)
         
+        # 只加载实际用到的模型（两个关键点模型的输出未被使用）
+        self.detect_age_gender = self.face_config.get('detect_age_gender', True)
+        default_modules = ['detection', 'recognition', 'genderage']
+        self.modules = list(self.face_config.get('modules', default_modules))
+        if not self.detect_age_gender and 'genderage' in self.modules:
+            self.modules.remove('genderage')
+        
+        # 可选的替换识别模型（如FP16转换后的w600k_r50_fp16.onnx），为空时使用模型包自带模型
+        self.recognition_model_path = self.face_config.get('recognition_model_path', '')
+        
+        # TensorRT推理配置
+        self.use_tensorrt = self.face_config.get('use_tensorrt', False)
+        self.trt_fp16 = self.face_config.get('trt_fp16', True)
+        self.trt_engine_cache_path = self.face_config.get('trt_engine_cache_path', './data/trt_cache')
+        
         # 新增的配置项
         self.max_faces_per_actor = self.face_config.get('max_faces_per_actor', 5)
         self.min_face_score = self.face_config.get('min_face_score', 0.8)
+        # 保存对齐人脸的JPEG质量（调低可加快保存、减小文件，但会损失画质）
+        self.aligned_face_jpeg_quality = self.face_config.get('aligned_face_jpeg_quality', 95)
+        
+        # OpenCV带CUDA时在GPU上做对齐仿射变换
+        self.use_cuda_warp = _cuda_warp_available()
         
         # 初始化InsightFace应用
         self.app = None
         self._init_face_analysis()
     
+    def reload_config(self):
+        """
+        重新加载人脸筛选配置
+        
+        只更新筛选参数，不重新加载模型；模型相关配置变更仍需重新创建实例
+        """
+        self.face_config = config.get_face_recognition_config()
+        self.max_faces_per_actor = self.face_config.get('max_faces_per_actor', 5)
+        self.min_face_score = self.face_config.get('min_face_score', 0.8)
+        logger.info(f"人脸筛选配置已更新: max_faces={self.max_faces_per_actor}, min_score={self.min_face_score}")
+    
     def _init_face_analysis(self):
         """初始化人脸分析应用"""
         try:
-            logger.info(f"初始化InsightFace模型: {self.model_name}")
+            logger.info(f"初始化InsightFace模型: {self.model_name}, 模块: {self.modules}")
             
             # 创建人脸分析应用
             self.app = FaceAnalysis(
                 name=self.model_name,
-                providers=['CUDAExecutionProvider', 'CPUExecutionProvider']
+                allowed_modules=self.modules,
+                providers=self._build_providers()
             )
             
-            # 准备模型，设置检测阈值
-            self.app.prepare(ctx_id=0, det_thresh=self.detection_threshold)
+            # 准备模型，设置检测阈值；固定检测输入尺寸，所有图片都letterbox到该尺寸，保证推理形状不变
+            self.app.prepare(ctx_id=0, det_thresh=self.detection_threshold, det_size=self.det_size)
+            self._load_recognition_override()
+            self._install_fast_nms()
             
             logger.info("InsightFace模型初始化成功")
             
@@ -56,6 +135,60 @@ class FaceProcessor:
             logger.error(f"InsightFace模型初始化失败: {e}")
             raise
     
+    def _load_recognition_override(self):
+        """加载配置指定的识别模型替换模型包自带的识别模型"""
+        if not self.recognition_model_path:
+            return
+        
+        model_path = Path(self.recognition_model_path)
+        if not model_path.exists():
+            logger.warning(f"识别模型文件不存在，使用默认识别模型: {model_path}")
+            return
+        
+        rec_model = insightface.model_zoo.get_model(str(model_path), providers=self._build_providers())
+        rec_model.prepare(ctx_id=0)
+        self.app.models['recognition'] = rec_model
+        logger.info(f"使用识别模型: {model_path}")
+    
+    def _install_fast_nms(self):
+        """安装numba时，用JIT编译的NMS替换检测模型自带的numpy实现"""
+        det_model = self.app.models.get('detection')
+        if not NUMBA_AVAILABLE or det_model is None or not hasattr(det_model, 'nms_thresh'):
+            return
+        
+        det_model.nms = lambda dets: nms(dets, det_model.nms_thresh)
+        logger.info("检测后处理使用numba NMS")
+    
+    def _build_providers(self) -> List[Any]:
+        """
+        构建ONNX Runtime执行提供器列表
+        
+        启用TensorRT且当前onnxruntime支持时优先使用TensorrtExecutionProvider，
+        引擎缓存到磁盘，避免每次启动重新构建引擎
+        
+        Returns:
+            providers列表
+        """
+        providers: List[Any] = [('CUDAExecutionProvider', dict(CUDA_PROVIDER_OPTIONS)), 'CPUExecutionProvider']
+        
+        if not self.use_tensorrt:
+            return providers
+        
+        if not ONNXRUNTIME_AVAILABLE or 'TensorrtExecutionProvider' not in onnxruntime.get_available_providers():
+            logger.warning("当前onnxruntime不支持TensorrtExecutionProvider，回退到CUDA推理")
+            return providers
+        
+        cache_path = Path(self.trt_engine_cache_path)
+        cache_path.mkdir(parents=True, exist_ok=True)
+        
+        trt_options = {
+            'trt_fp16_enable': '1' if self.trt_fp16 else '0',
+            'trt_engine_cache_enable': '1',
+            'trt_engine_cache_path': str(cache_path),
+        }
+        logger.info(f"启用TensorRT推理: fp16={self.trt_fp16}, 引擎缓存={cache_path}")
+        return [('TensorrtExecutionProvider', trt_options)] + providers
+    
     def detect_faces(self, image: np.ndarray) -> List[Dict[str, Any]]:
         """
         检测图片中的人脸
@@ -73,25 +206,89 @@ class FaceProcessor:
             # 使用InsightFace检测人脸
             faces = self.app.get(image)
             
-            face_info = []
-            for face in faces:
-                info = {
-                    'bbox': face.bbox.astype(int).tolist(),  # 边界框 [x1, y1, x2, y2]
-                    'kps': face.kps.astype(int).tolist() if hasattr(face, 'kps') else None,  # 关键点
-                    'det_score': float(face.det_score),  # 检测置信度
-                    'embedding': face.embedding,  # 人脸特征向量
-                    'age': int(face.age) if hasattr(face, 'age') else None,  # 年龄
-                    'gender': int(face.gender) if hasattr(face, 'gender') else None,  # 性别
-                }
-                face_info.append(info)
-            
-            logger.debug(f"检测到 {len(face_info)} 张人脸")
+            face_info = [self._face_to_info(face) for face in faces]
+            
+            logger.debug("检测到 {} 张人脸", len(face_info))
             return face_info
             
         except Exception as e:
             logger.error(f"人脸检测失败: {e}")
             return []
     
+    @staticmethod
+    def _face_to_info(face: Face) -> Dict[str, Any]:
+        """将InsightFace的Face对象转换为人脸信息字典"""
+        embedding = np.asarray(face.embedding, dtype=np.float32)
+        return {
+            'bbox': face.bbox.astype(np.float32),  # 边界框 [x1, y1, x2, y2]
+            'kps': face.kps.astype(np.float32) if face.get('kps') is not None else None,  # 关键点
+            'det_score': float(face.det_score),  # 检测置信度
+            'embedding': embedding,  # 人脸特征向量
+            'embedding_norm': embedding / (np.linalg.norm(embedding) + 1e-12),  # 归一化特征向量
+            'age': int(face.age) if face.get('age') is not None else None,  # 年龄
+            'gender': int(face.gender) if face.get('gender') is not None else None,  # 性别
+        }
+    
+    def batch_detect_faces(self, images: List[np.ndarray], batch_size: int = 16) -> List[List[Dict[str, Any]]]:
+        """
+        批量检测多张图片中的人脸
+        
+        检测模型的输入批大小固定为1，逐张检测；识别模型支持动态批大小，
+        将多张图片中所有人脸的对齐图合并为一次推理，减少推理调用次数
+        
+        Args:
+            images: 输入图片列表 (BGR格式)
+            batch_size: 每次识别推理合并的图片数量
+            
+        Returns:
+            每张图片对应的人脸信息列表
+        """
+        if self.app is None:
+            raise RuntimeError("人脸分析应用未初始化")
+        
+        rec_model = self.app.models.get('recognition')
+        if rec_model is None:
+            return [self.detect_faces(image) for image in images]
+        
+        results = []
+        for start in range(0, len(images), batch_size):
+            batch_faces = []
+            aligned_crops = []
+            
+            for image in images[start:start + batch_size]:
+                faces = []
+                crops = []
+                try:
+                    bboxes, kpss = self.app.det_model.detect(image, max_num=0, metric='default')
+                    for i in range(bboxes.shape[0]):
+                        face = Face(bbox=bboxes[i, 0:4], kps=kpss[i] if kpss is not None else None,
+                                    det_score=bboxes[i, 4])
+                        # 识别以外的模型（如性别年龄）仍按人脸单独推理
+                        for taskname, model in self.app.models.items():
+                            if taskname not in ('detection', 'recognition'):
+                                model.get(image, face)
+                        crops.append(face_align.norm_crop(image, landmark=face.kps,
+                                                          image_size=rec_model.input_size[0]))
+                        faces.append(face)
+                except Exception as e:
+                    logger.error(f"人脸检测失败: {e}")
+                    faces = []
+                    crops = []
+                # 整张图片处理成功后才加入本批，保证对齐图与人脸一一对应
+                aligned_crops.extend(crops)
+                batch_faces.append(faces)
+            
+            # 一次推理提取本批所有人脸的特征向量
+            if aligned_crops:
+                embeddings = rec_model.get_feat(aligned_crops)
+                face_iter = (face for faces in batch_faces for face in faces)
+                for face, embedding in zip(face_iter, embeddings):
+                    face.embedding = embedding
+            
+            results.extend([self._face_to_info(face) for face in faces] for faces in batch_faces)
+        
+        return results
+    
     def extract_face_embedding(self, image: np.ndarray, face_info: Dict[str, Any] = None) -> Optional[np.ndarray]:
         """
         提取人脸特征向量
@@ -115,8 +312,30 @@ class FaceProcessor:
         
         return face_info.get('embedding')
     
+    def _upload_for_warp(self, image: np.ndarray) -> Optional[Any]:
+        """
+        将图片上传到GPU供同一帧的多张人脸对齐复用
+        
+        Args:
+            image: 输入图片
+            
+        Returns:
+            GpuMat，不支持CUDA或上传失败时返回None
+        """
+        if not self.use_cuda_warp or not self.face_alignment:
+            return None
+        
+        try:
+            gpu_image = cv2.cuda_GpuMat()
+            gpu_image.upload(image)
+            return gpu_image
+        except cv2.error as e:
+            logger.warning(f"上传图片到GPU失败，使用CPU对齐: {e}")
+            return None
+    
     def align_face(self, image: np.ndarray, face_info: Dict[str, Any], 
-                   output_size: Tuple[int, int] = (112, 112)) -> Optional[np.ndarray]:
+                   output_size: Tuple[int, int] = (112, 112),
+                   gpu_image: Optional[Any] = None) -> Optional[np.ndarray]:
         """
         人脸对齐
         
@@ -124,53 +343,101 @@ class FaceProcessor:
             image: 输入图片
             face_info: 人脸信息
             output_size: 输出尺寸
+            gpu_image: 已上传到GPU的同一图片（见_upload_for_warp），None时在CPU上变换
             
         Returns:
             对齐后的人脸图片
         """
         if not self.face_alignment or 'kps' not in face_info or face_info['kps'] is None:
             # 如果没有关键点信息，直接裁剪
-            bbox = face_info['bbox']
-            x1, y1, x2, y2 = bbox
+            x1, y1, x2, y2 = np.asarray(face_info['bbox']).astype(np.int32)
             face_crop = image[y1:y2, x1:x2]
             return cv2.resize(face_crop, output_size)
         
         try:
             # 使用5个关键点进行仿射变换对齐
-            kps = np.array(face_info['kps']).reshape(5, 2)
-            
-            # 标准人脸关键点位置 (112x112)
-            src = np.array([
-                [30.2946, 51.6963],  # 左眼
-                [65.5318, 51.5014],  # 右眼
-                [48.0252, 71.7366],  # 鼻尖
-                [33.5493, 92.3655],  # 左嘴角
-                [62.7299, 92.2041]   # 右嘴角
-            ], dtype=np.float32)
-            
-            if output_size != (112, 112):
-                # 缩放标准关键点位置
-                scale_x = output_size[0] / 112
-                scale_y = output_size[1] / 112
-                src[:, 0] *= scale_x
-                src[:, 1] *= scale_y
-            
-            # 计算仿射变换矩阵
-            tform = cv2.estimateAffinePartial2D(kps, src)[0]
-            
-            # 应用仿射变换
-            aligned_face = cv2.warpAffine(image, tform, output_size)
+            kps = np.asarray(face_info['kps'], dtype=np.float64).reshape(5, 2)
+            src = self._get_src_template(output_size)
+            
+            # 计算相似变换矩阵（5点闭式解，无需RANSAC）
+            tform = self._similarity_transform(kps, src)
+            
+            # 应用仿射变换，GPU上只下载对齐后的小图
+            if gpu_image is not None:
+                aligned_face = cv2.cuda.warpAffine(gpu_image, tform, output_size).download()
+            else:
+                aligned_face = cv2.warpAffine(image, tform, output_size)
             
             return aligned_face
             
         except Exception as e:
             logger.warning(f"人脸对齐失败，使用简单裁剪: {e}")
             # 回退到简单裁剪
-            bbox = face_info['bbox']
-            x1, y1, x2, y2 = bbox
+            x1, y1, x2, y2 = np.asarray(face_info['bbox']).astype(np.int32)
             face_crop = image[y1:y2, x1:x2]
             return cv2.resize(face_crop, output_size)
     
+    @staticmethod
+    def to_json_dict(face_info: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        将人脸信息中的bbox/kps坐标转换为整数列表，便于JSON序列化和存储
+        
+        Args:
+            face_info: 人脸信息（bbox/kps为float32数组）
+            
+        Returns:
+            坐标已转换的人脸信息副本
+        """
+        result = dict(face_info)
+        for key in ('bbox', 'kps'):
+            if isinstance(result.get(key), np.ndarray):
+                result[key] = result[key].astype(int).tolist()
+        return result
+    
+    @classmethod
+    def _get_src_template(cls, output_size: Tuple[int, int]) -> np.ndarray:
+        """获取指定输出尺寸下的标准人脸关键点位置（按尺寸缓存）"""
+        src = cls._SRC_TEMPLATES.get(output_size)
+        if src is None:
+            # 缩放标准关键点位置
+            src = ARCFACE_SRC_112 * np.array([output_size[0] / 112, output_size[1] / 112])
+            src.setflags(write=False)
+            cls._SRC_TEMPLATES[output_size] = src
+        return src
+    
+    @staticmethod
+    def _similarity_transform(src_pts: np.ndarray, dst_pts: np.ndarray) -> np.ndarray:
+        """
+        Umeyama闭式求解从src_pts到dst_pts的相似变换
+        
+        Args:
+            src_pts: 源关键点 (N, 2)
+            dst_pts: 目标关键点 (N, 2)
+            
+        Returns:
+            2x3仿射变换矩阵
+        """
+        src_mean = src_pts.mean(axis=0)
+        dst_mean = dst_pts.mean(axis=0)
+        src_centered = src_pts - src_mean
+        dst_centered = dst_pts - dst_mean
+        
+        covariance = dst_centered.T @ src_centered / len(src_pts)
+        U, S, Vt = np.linalg.svd(covariance)
+        
+        # 避免反射
+        d = np.ones(2)
+        if np.linalg.det(U) * np.linalg.det(Vt) < 0:
+            d[1] = -1
+        
+        rotation = U @ np.diag(d) @ Vt
+        scale = (S * d).sum() / (src_centered ** 2).sum(axis=1).mean()
+        
+        tform = np.empty((2, 3), dtype=np.float64)
+        tform[:, :2] = scale * rotation
+        tform[:, 2] = dst_mean - scale * rotation @ src_mean
+        return tform
+    
     def _imread_chinese(self, image_path: str) -> Optional[np.ndarray]:
         """
         支持中文路径的图片读取函数
@@ -182,45 +449,50 @@ class FaceProcessor:
             图片数组，如果读取失败返回None
         """
         try:
-            # 使用numpy读取支持中文路径
-            with open(image_path, 'rb') as f:
-                image_data = np.frombuffer(f.read(), np.uint8)
-                image = cv2.imdecode(image_data, cv2.IMREAD_COLOR)
-                return image
+            # 使用numpy直接读入缓冲区，支持中文路径
+            image_data = np.fromfile(image_path, dtype=np.uint8)
+            return cv2.imdecode(image_data, cv2.IMREAD_COLOR)
         except Exception as e:
             logger.error(f"读取图片失败 {image_path}: {e}")
             return None
     
-    def _imwrite_chinese(self, image_path: str, image: np.ndarray) -> bool:
+    def _imwrite_chinese(self, image_path: str, image: np.ndarray, quality: int = 95) -> bool:
         """
         支持中文路径的图片保存函数
         
         Args:
             image_path: 图片保存路径
             image: 图片数组
+            quality: JPEG质量
             
         Returns:
             保存是否成功
         """
         try:
+            params = [cv2.IMWRITE_JPEG_QUALITY, quality, cv2.IMWRITE_JPEG_OPTIMIZE, 0]
+            
+            # 纯ASCII路径直接由OpenCV编码写入
+            if image_path.isascii():
+                return bool(cv2.imwrite(image_path, image, params))
+            
             # 编码图片
-            success, encoded_image = cv2.imencode('.jpg', image)
+            success, encoded_image = cv2.imencode('.jpg', image, params)
             if success:
-                # 写入文件
-                with open(image_path, 'wb') as f:
-                    f.write(encoded_image.tobytes())
+                # 直接从numpy缓冲区写入文件
+                encoded_image.tofile(image_path)
                 return True
             return False
         except Exception as e:
             logger.error(f"保存图片失败 {image_path}: {e}")
             return False
 
-    def process_image(self, image_path: str) -> List[Dict[str, Any]]:
+    def process_image(self, image_path: str, need_aligned: bool = True) -> List[Dict[str, Any]]:
         """
         处理单张图片，提取所有人脸信息
         
         Args:
             image_path: 图片路径
+            need_aligned: 是否生成对齐后的人脸图片（aligned_face）
             
         Returns:
             人脸信息列表
@@ -234,32 +506,60 @@ class FaceProcessor:
             
             # 检测人脸
             faces = self.detect_faces(image)
+            return self._build_face_data(image, image_path, faces, need_aligned)
             
+        except Exception as e:
+            logger.error(f"处理图片失败 {image_path}: {e}")
+            return []
+    
+    def _build_face_data(self, image: np.ndarray, image_path: str,
+                         faces: List[Dict[str, Any]], need_aligned: bool = True) -> List[Dict[str, Any]]:
+        """
+        对齐检测到的人脸并组装人脸数据
+        
+        特征向量已由识别模型提取，对齐图仅在需要保存或返回时才生成
+        
+        Args:
+            image: 原始图片
+            image_path: 图片路径
+            faces: 检测到的人脸信息列表
+            need_aligned: 是否生成对齐后的人脸图片
+            
+        Returns:
+            人脸数据列表
+        """
+        try:
             # 处理每张人脸
             processed_faces = []
+            gpu_image = self._upload_for_warp(image) if need_aligned and faces else None
             for i, face_info in enumerate(faces):
                 try:
-                    # 对齐人脸
-                    aligned_face = self.align_face(image, face_info)
+                    face_data = {
+                        'face_id': i,
+                        'image_path': image_path,
+                        'bbox': self.to_json_dict(face_info)['bbox'],
+                        'det_score': face_info['det_score'],
+                        'embedding': face_info['embedding'],
+                        'embedding_norm': face_info.get('embedding_norm'),
+                        'age': face_info.get('age'),
+                        'gender': face_info.get('gender')
+                    }
+                    
+                    if need_aligned:
+                        # 对齐人脸
+                        aligned_face = self.align_face(image, face_info, gpu_image=gpu_image)
+                        if aligned_face is None:
+                            continue
+                        face_data['aligned_face'] = aligned_face
                     
-                    if aligned_face is not None:
-                        face_data = {
-                            'face_id': i,
-                            'image_path': image_path,
-                            'bbox': face_info['bbox'],
-                            'det_score': face_info['det_score'],
-                            'embedding': face_info['embedding'],
-                            'aligned_face': aligned_face,
-                            'age': face_info.get('age'),
-                            'gender': face_info.get('gender')
-                        }
-                        processed_faces.append(face_data)
+                    processed_faces.append(face_data)
                         
                 except Exception as e:
                     logger.warning(f"处理人脸 {i} 失败: {e}")
                     continue
             
-            logger.debug(f"成功处理 {len(processed_faces)} 张人脸，来源: {Path(image_path).name}")
+            logger.opt(lazy=True).debug("成功处理 {} 张人脸，来源: {}",
+                                        lambda: len(processed_faces), lambda: Path(image_path).name)
             return processed_faces
             
         except Exception as e:
@@ -267,13 +567,14 @@ class FaceProcessor:
             return []
     
     def batch_process_images(self, image_paths: List[str], 
-                           save_aligned_faces: bool = True) -> List[Dict[str, Any]]:
+                           save_aligned_faces: bool = True, batch_size: int = 16) -> List[Dict[str, Any]]:
         """
         批量处理图片
         
         Args:
             image_paths: 图片路径列表
             save_aligned_faces: 是否保存对齐后的人脸图片
+            batch_size: 每批合并推理的图片数量
             
         Returns:
             所有人脸信息列表
@@ -288,50 +589,106 @@ class FaceProcessor:
             aligned_faces_dir = Path(storage_config.get('images_dir', './data/images')) / 'aligned_faces'
             aligned_faces_dir.mkdir(parents=True, exist_ok=True)
         
-        for image_path in image_paths:
-            try:
-                faces = self.process_image(image_path)
+        path_batches = [image_paths[start:start + batch_size] for start in range(0, len(image_paths), batch_size)]
+        
+        # 后台线程预读下一批图片、异步保存对齐人脸，与模型推理重叠
+        with ThreadPoolExecutor(max_workers=self.IMAGE_READ_WORKERS, thread_name_prefix='face-imread') as read_pool, \
+                ThreadPoolExecutor(max_workers=self.IMAGE_WRITE_WORKERS, thread_name_prefix='face-imwrite') as write_pool:
+            
+            def submit_reads(paths: List[str]):
+                return [(path, read_pool.submit(self._imread_chinese, path)) for path in paths]
+            
+            pending_reads = submit_reads(path_batches[0]) if path_batches else []
+            
+            for batch_index in range(len(path_batches)):
+                current_reads = pending_reads
+                if batch_index + 1 < len(path_batches):
+                    pending_reads = submit_reads(path_batches[batch_index + 1])
                 
-                for face_data in faces:
-                    # 保存对齐后的人脸图片
-                    if save_aligned_faces and aligned_faces_dir:
-                        image_name = Path(image_path).stem
-                        face_id = face_data['face_id']
-                        aligned_path = aligned_faces_dir / f"{image_name}_face_{face_id}.jpg"
-                        
-                        self._imwrite_chinese(str(aligned_path), face_data['aligned_face'])
-                        face_data['aligned_face_path'] = str(aligned_path)
-                        
-                        # 移除内存中的图片数据以节省空间
-                        del face_data['aligned_face']
-                    
-                    all_faces.append(face_data)
-                    
-            except Exception as e:
-                logger.error(f"处理图片失败 {image_path}: {e}")
-                continue
+                # 收集当前批次的读取结果并批量检测、提取特征
+                batch_paths = []
+                batch_images = []
+                for image_path, future in current_reads:
+                    image = future.result()
+                    if image is None:
+                        logger.error(f"无法读取图片: {image_path}")
+                        continue
+                    batch_paths.append(image_path)
+                    batch_images.append(image)
+                
+                if not batch_images:
+                    continue
+                
+                try:
+                    batch_faces = self.batch_detect_faces(batch_images, batch_size)
+                except Exception as e:
+                    logger.error(f"批量检测人脸失败: {e}")
+                    continue
+                
+                for image_path, image, detected in zip(batch_paths, batch_images, batch_faces):
+                    face_data = self._build_face_data(image, image_path, detected, save_aligned_faces)
+                    self._collect_faces(face_data, image_path, all_faces, aligned_faces_dir, write_pool)
         
         logger.info(f"批量处理完成，共提取 {len(all_faces)} 张人脸")
         return all_faces
     
-    def calculate_face_similarity(self, embedding1: np.ndarray, embedding2: np.ndarray) -> float:
+    def _collect_faces(self, faces: List[Dict[str, Any]], image_path: str,
+                       all_faces: List[Dict[str, Any]], aligned_faces_dir: Optional[Path],
+                       write_pool: Optional[ThreadPoolExecutor] = None):
+        """
+        保存对齐后的人脸图片并加入结果列表
+        
+        Args:
+            faces: 单张图片的人脸数据列表
+            image_path: 图片路径
+            all_faces: 结果列表（原地追加）
+            aligned_faces_dir: 对齐人脸保存目录，None表示不保存
+            write_pool: 异步保存图片的线程池，None时同步保存
+        """
+        try:
+            for face_data in faces:
+                # 保存对齐后的人脸图片
+                if aligned_faces_dir:
+                    image_name = Path(image_path).stem
+                    face_id = face_data['face_id']
+                    aligned_path = aligned_faces_dir / f"{image_name}_face_{face_id}.jpg"
+                    
+                    if write_pool is not None:
+                        write_pool.submit(self._imwrite_chinese, str(aligned_path), face_data['aligned_face'],
+                                          self.aligned_face_jpeg_quality)
+                    else:
+                        self._imwrite_chinese(str(aligned_path), face_data['aligned_face'],
+                                              self.aligned_face_jpeg_quality)
+                    face_data['aligned_face_path'] = str(aligned_path)
+                    
+                    # 移除内存中的图片数据以节省空间
+                    del face_data['aligned_face']
+                
+                all_faces.append(face_data)
+                
+        except Exception as e:
+            logger.error(f"处理图片失败 {image_path}: {e}")
+    
+    def calculate_face_similarity(self, embedding1: np.ndarray, embedding2: np.ndarray,
+                                  already_normalized: bool = False) -> float:
         """
         计算两个人脸特征向量的相似度
         
         Args:
             embedding1: 人脸特征向量1
             embedding2: 人脸特征向量2
+            already_normalized: 输入向量是否已归一化（如人脸信息中的embedding_norm）
             
         Returns:
             相似度 (0-1之间，1表示完全相同)
         """
         try:
-            # 归一化特征向量
-            embedding1 = embedding1 / np.linalg.norm(embedding1)
-            embedding2 = embedding2 / np.linalg.norm(embedding2)
-            
-            # 计算余弦相似度
-            similarity = np.dot(embedding1, embedding2)
+            # 计算余弦相似度：用标量范数相除，避免生成归一化后的临时数组
+            similarity = float(np.inner(embedding1, embedding2))
+            if not already_normalized:
+                norm1 = math.sqrt(float(np.inner(embedding1, embedding1)))
+                norm2 = math.sqrt(float(np.inner(embedding2, embedding2)))
+                similarity /= norm1 * norm2
             
             # 将相似度映射到0-1范围
             similarity = (similarity + 1) / 2
@@ -368,22 +725,28 @@ class FaceProcessor:
         filtered_faces.sort(key=lambda x: x['det_score'], reverse=True)
         
         # 简单去重：移除相似度过高的人脸
+        # 一次矩阵乘法得到两两余弦相似度；(cos+1)/2 > 0.95 等价于 cos > 0.9
         final_faces = []
-        for face in filtered_faces:
-            is_duplicate = False
-            for existing_face in final_faces:
-                similarity = self.calculate_face_similarity(
-                    face['embedding'], existing_face['embedding']
-                )
-                if similarity > 0.95:  # 相似度阈值
-                    is_duplicate = True
-                    break
-            
-            if not is_duplicate:
+        if filtered_faces:
+            if all(face.get('embedding_norm') is not None for face in filtered_faces):
+                embeddings = np.stack([face['embedding_norm'] for face in filtered_faces]).astype(np.float32, copy=False)
+            else:
+                embeddings = np.stack([face['embedding'] for face in filtered_faces]).astype(np.float32)
+                norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+                embeddings /= np.maximum(norms, 1e-12)
+            similarity_matrix = embeddings @ embeddings.T
+            duplicate_threshold = 0.95 * 2 - 1
+            
+            kept_indices: List[int] = []
+            for i, face in enumerate(filtered_faces):
+                if kept_indices and np.any(similarity_matrix[i, kept_indices] > duplicate_threshold):
+                    continue
+                
+                kept_indices.append(i)
                 final_faces.append(face)
                 
-            if len(final_faces) >= max_faces:
-                break
+                if len(final_faces) >= max_faces:
+                    break
         
         # 详细的过滤统计
         original_count = len(faces)
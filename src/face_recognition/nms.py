@@ -0,0 +1,86 @@
+"""
+人脸检测NMS后处理
+安装numba时使用JIT编译的实现，否则使用numpy向量化实现
+"""
+import numpy as np
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _nms_numpy(dets: np.ndarray, thresh: float) -> np.ndarray:
+    """numpy实现的NMS（与SCRFD自带实现一致）"""
+    x1, y1, x2, y2, scores = dets[:, 0], dets[:, 1], dets[:, 2], dets[:, 3], dets[:, 4]
+    areas = (x2 - x1 + 1) * (y2 - y1 + 1)
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+
+        w = np.maximum(0.0, xx2 - xx1 + 1)
+        h = np.maximum(0.0, yy2 - yy1 + 1)
+        inter = w * h
+        ovr = inter / (areas[i] + areas[order[1:]] - inter)
+
+        order = order[np.where(ovr <= thresh)[0] + 1]
+
+    return np.array(keep, dtype=np.int64)
+
+
+def _nms_loop(dets: np.ndarray, thresh: float) -> np.ndarray:
+    """逐对比较的NMS，供numba编译"""
+    n = dets.shape[0]
+    x1, y1, x2, y2, scores = dets[:, 0], dets[:, 1], dets[:, 2], dets[:, 3], dets[:, 4]
+    areas = (x2 - x1 + 1) * (y2 - y1 + 1)
+    order = np.argsort(scores)[::-1]
+
+    suppressed = np.zeros(n, dtype=np.bool_)
+    keep = np.empty(n, dtype=np.int64)
+    count = 0
+    for _i in range(n):
+        i = order[_i]
+        if suppressed[i]:
+            continue
+        keep[count] = i
+        count += 1
+
+        for _j in range(_i + 1, n):
+            j = order[_j]
+            if suppressed[j]:
+                continue
+            w = max(0.0, min(x2[i], x2[j]) - max(x1[i], x1[j]) + 1)
+            h = max(0.0, min(y2[i], y2[j]) - max(y1[i], y1[j]) + 1)
+            inter = w * h
+            if inter / (areas[i] + areas[j] - inter) > thresh:
+                suppressed[j] = True
+
+    return keep[:count]
+
+
+if NUMBA_AVAILABLE:
+    _nms_impl = numba.njit(cache=True, fastmath=True)(_nms_loop)
+else:
+    _nms_impl = _nms_numpy
+
+
+def nms(dets: np.ndarray, thresh: float) -> np.ndarray:
+    """
+    非极大值抑制
+
+    Args:
+        dets: 检测框数组 (N, 5)，每行为 [x1, y1, x2, y2, score]
+        thresh: IoU阈值，超过该值的低分框被抑制
+
+    Returns:
+        保留的检测框下标（按分数降序）
+    """
+    return _nms_impl(np.ascontiguousarray(dets, dtype=np.float32), float(thresh))
@@ -2,12 +2,11 @@
 中文文字渲染工具
 解决OpenCV不支持中文显示的问题
 """
-import cv2
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 from pathlib import Path
 import platform
-from typing import Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
 
 from .logger import get_logger
 
@@ -22,6 +21,11 @@ class ChineseTextRenderer:
         self.font_cache = {}
         self.default_font_path = self._find_system_font()
         
+        # 文字尺寸缓存及复用的测量画布
+        self.text_size_cache: Dict[Tuple[str, int, Optional[str]], Tuple[int, int]] = {}
+        self.text_size_cache_max = 4096
+        self._measure_draw = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+        
     def _find_system_font(self) -> Optional[str]:
         """查找系统中文字体"""
         font_paths = []
@@ -100,24 +104,104 @@ class ChineseTextRenderer:
         Returns:
             (width, height) 文字尺寸
         """
+        cache_key = (text, font_size, font_path or self.default_font_path)
+        size = self.text_size_cache.get(cache_key)
+        if size is not None:
+            return size
+        
         try:
             font = self._get_font(font_size, font_path)
             
-            # 创建临时图片来测量文字尺寸
-            temp_img = Image.new('RGB', (1, 1))
-            draw = ImageDraw.Draw(temp_img)
-            
             # 使用textbbox获取更准确的尺寸
-            bbox = draw.textbbox((0, 0), text, font=font)
-            width = bbox[2] - bbox[0]
-            height = bbox[3] - bbox[1]
-            
-            return (width, height)
+            bbox = self._measure_draw.textbbox((0, 0), text, font=font)
+            size = (bbox[2] - bbox[0], bbox[3] - bbox[1])
             
         except Exception as e:
             logger.error(f"获取文字尺寸失败: {e}")
             # 返回估算尺寸
             return (len(text) * font_size, font_size)
+        
+        if len(self.text_size_cache) >= self.text_size_cache_max:
+            self.text_size_cache.clear()
+        self.text_size_cache[cache_key] = size
+        
+        return size
+    
+    @staticmethod
+    def _rgb_to_bgr(color: Optional[Tuple[int, int, int]]) -> Optional[Tuple[int, int, int]]:
+        """交换颜色元组的R/B通道"""
+        if color is None:
+            return None
+        return (color[2], color[1], color[0])
+    
+    def _draw_text_item(self, draw: ImageDraw.ImageDraw, text: str, position: Tuple[int, int],
+                        font_size: int = 20, color: Tuple[int, int, int] = (255, 255, 255),
+                        background_color: Tuple[int, int, int] = None,
+                        background_padding: int = 5,
+                        outline_color: Tuple[int, int, int] = None,
+                        outline_width: int = 0, font_path: str = None) -> None:
+        """在PIL画布上绘制单段文字（可选背景和描边）"""
+        # 画布直接使用BGR字节，RGB颜色需交换R/B通道
+        color = self._rgb_to_bgr(color)
+        background_color = self._rgb_to_bgr(background_color)
+        outline_color = self._rgb_to_bgr(outline_color)
+        
+        # 获取字体
+        font = self._get_font(font_size, font_path)
+        
+        x, y = position
+        
+        # 绘制背景
+        if background_color is not None:
+            text_width, text_height = self.get_text_size(text, font_size, font_path)
+            
+            # 背景矩形坐标
+            bg_x1 = x - background_padding
+            bg_y1 = y - text_height - background_padding
+            bg_x2 = x + text_width + background_padding
+            bg_y2 = y + background_padding
+            
+            # 绘制背景矩形
+            draw.rectangle([bg_x1, bg_y1, bg_x2, bg_y2], fill=background_color)
+        
+        # 绘制文字，描边由Pillow的stroke参数一次完成
+        if outline_color is not None and outline_width > 0:
+            draw.text((x, y - font_size), text, font=font, fill=color,
+                      stroke_width=outline_width, stroke_fill=outline_color)
+        else:
+            draw.text((x, y - font_size), text, font=font, fill=color)
+    
+    def draw_texts_on_image(self, img: np.ndarray, items: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        在图像上批量绘制中文文字
+        
+        所有文字绘制在同一个PIL画布上；画布直接复用BGR字节，不做颜色空间转换
+        
+        Args:
+            img: 输入图像 (BGR格式)
+            items: 文字参数列表，每项包含text、position，以及可选的font_size、color、
+                   background_color、background_padding、outline_color、outline_width、font_path
+            
+        Returns:
+            绘制文字后的图像
+        """
+        if not items:
+            return img
+        
+        try:
+            # 按字节将BGR图像当作RGB画布使用，绘制颜色在_draw_text_item中交换通道
+            img_pil = Image.fromarray(np.ascontiguousarray(img))
+            draw = ImageDraw.Draw(img_pil)
+            
+            for item in items:
+                self._draw_text_item(draw, **item)
+            
+            return np.array(img_pil)
+            
+        except Exception as e:
+            logger.error(f"绘制中文文字失败: {e}")
+            # 如果失败，返回原图
+            return img
     
     def draw_text_on_image(self, img: np.ndarray, text: str, position: Tuple[int, int], 
                           font_size: int = 20, color: Tuple[int, int, int] = (255, 255, 255),
@@ -139,42 +223,15 @@ class ChineseTextRenderer:
         Returns:
             绘制文字后的图像
         """
-        try:
-            # 将BGR转换为RGB
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            img_pil = Image.fromarray(img_rgb)
-            draw = ImageDraw.Draw(img_pil)
-            
-            # 获取字体
-            font = self._get_font(font_size, font_path)
-            
-            x, y = position
-            
-            # 绘制背景
-            if background_color is not None:
-                text_width, text_height = self.get_text_size(text, font_size, font_path)
-                
-                # 背景矩形坐标
-                bg_x1 = x - background_padding
-                bg_y1 = y - text_height - background_padding
-                bg_x2 = x + text_width + background_padding
-                bg_y2 = y + background_padding
-                
-                # 绘制背景矩形
-                draw.rectangle([bg_x1, bg_y1, bg_x2, bg_y2], fill=background_color)
-            
-            # 绘制文字
-            draw.text((x, y - font_size), text, font=font, fill=color)
-            
-            # 转换回BGR格式
-            img_bgr = cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
-            
-            return img_bgr
-            
-        except Exception as e:
-            logger.error(f"绘制中文文字失败: {e}")
-            # 如果失败，返回原图
-            return img
+        return self.draw_texts_on_image(img, [{
+            'text': text,
+            'position': position,
+            'font_size': font_size,
+            'color': color,
+            'background_color': background_color,
+            'background_padding': background_padding,
+            'font_path': font_path,
+        }])
     
     def draw_text_with_outline(self, img: np.ndarray, text: str, position: Tuple[int, int],
                               font_size: int = 20, text_color: Tuple[int, int, int] = (255, 255, 255),
@@ -196,36 +253,15 @@ class ChineseTextRenderer:
         Returns:
             绘制文字后的图像
         """
-        try:
-            # 将BGR转换为RGB
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            img_pil = Image.fromarray(img_rgb)
-            draw = ImageDraw.Draw(img_pil)
-            
-            # 获取字体
-            font = self._get_font(font_size, font_path)
-            
-            x, y = position
-            text_y = y - font_size
-            
-            # 绘制描边
-            for dx in range(-outline_width, outline_width + 1):
-                for dy in range(-outline_width, outline_width + 1):
-                    if dx != 0 or dy != 0:
-                        draw.text((x + dx, text_y + dy), text, font=font, fill=outline_color)
-            
-            # 绘制主文字
-            draw.text((x, text_y), text, font=font, fill=text_color)
-            
-            # 转换回BGR格式
-            img_bgr = cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
-            
-            return img_bgr
-            
-        except Exception as e:
-            logger.error(f"绘制带描边中文文字失败: {e}")
-            # 如果失败，返回原图
-            return img
+        return self.draw_texts_on_image(img, [{
+            'text': text,
+            'position': position,
+            'font_size': font_size,
+            'color': text_color,
+            'outline_color': outline_color,
+            'outline_width': outline_width,
+            'font_path': font_path,
+        }])
 
 
 # 创建全局实例
@@ -2,12 +2,21 @@
 角色颜色和框形管理器
 为每个电影的角色分配独特的颜色和框形
 """
+import atexit
 import json
-import random
+import os
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Dict, List, Tuple, Any, Optional
 from ..utils.logger import get_logger
 
+# orjson相关导入（可选，序列化速度更快）
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = get_logger(__name__)
 
 
@@ -38,6 +47,16 @@ class ColorManager:
         (72, 61, 139),    # 深石板蓝
     ]
     
+    # 调色板派生的RGB/十六进制颜色（类定义时计算一次）
+    _COLOR_TABLE = tuple(
+        {
+            'color_bgr': c,
+            'color_rgb': (c[2], c[1], c[0]),
+            'color_hex': f"#{c[2]:02x}{c[1]:02x}{c[0]:02x}",
+        }
+        for c in COLOR_PALETTE
+    )
+    
     # 框形类型
     SHAPE_TYPES = {
         'rectangle': '矩形框',
@@ -60,14 +79,30 @@ class ColorManager:
         self.color_config_file = self.storage_dir / "color_config.json"
         self.color_config = self._load_color_config()
         
+        # (电影, 角色) → 角色配置的扁平索引，配置字典与color_config共享
+        self._char_index: Dict[Tuple[str, str], Dict[str, Any]] = {
+            (movie_title, character_name): character_config
+            for movie_title, movie_config in self.color_config['movies'].items()
+            for character_name, character_config in movie_config.get('characters', {}).items()
+        }
+        
+        # 调色板信息缓存
+        self._palette_info: Optional[List[Dict[str, Any]]] = None
+        
+        # 批量修改时延迟写盘
+        self._dirty = False
+        self._batch_depth = 0
+        self._atexit_registered = False
+        
         logger.info("颜色管理器初始化完成")
     
     def _load_color_config(self) -> Dict[str, Any]:
         """加载颜色配置"""
         if self.color_config_file.exists():
             try:
-                with open(self.color_config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
+                with open(self.color_config_file, 'rb') as f:
+                    data = f.read()
+                config = orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
                 logger.info(f"加载颜色配置成功，包含 {len(config.get('movies', {}))} 部电影")
                 return config
             except Exception as e:
@@ -89,14 +124,77 @@ class ColorManager:
     def _save_color_config(self) -> bool:
         """保存颜色配置"""
         try:
-            with open(self.color_config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.color_config, f, ensure_ascii=False, indent=2)
+            if ORJSON_AVAILABLE:
+                data = orjson.dumps(self.color_config, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            else:
+                data = json.dumps(self.color_config, ensure_ascii=False, indent=2).encode('utf-8')
+            
+            # 先写入临时文件并落盘，再替换目标文件，避免保存中断导致配置文件损坏
+            tmp_path = self.color_config_file.with_name(self.color_config_file.name + '.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.color_config_file)
             logger.info("颜色配置保存成功")
             return True
         except Exception as e:
             logger.error(f"保存颜色配置失败: {e}")
             return False
     
+    def _mark_dirty(self):
+        """标记配置已修改，等待flush写盘"""
+        self._dirty = True
+    
+    def _commit(self) -> bool:
+        """
+        提交一次修改：不在批量模式中时立即写盘，否则延迟到批量结束
+        
+        Returns:
+            是否保存成功（批量模式中始终返回True）
+        """
+        self._mark_dirty()
+        if self._batch_depth == 0:
+            return self.flush()
+        return True
+    
+    def flush(self) -> bool:
+        """
+        将未保存的修改写入配置文件
+        
+        Returns:
+            是否保存成功
+        """
+        if not self._dirty:
+            return True
+        
+        if self._save_color_config():
+            self._dirty = False
+            return True
+        return False
+    
+    @contextmanager
+    def batch(self):
+        """
+        批量修改上下文，期间的所有修改在退出时只写盘一次
+        
+        用法:
+            with color_manager.batch():
+                color_manager.assign_colors_for_movie(...)
+                color_manager.update_character_shape(...)
+        """
+        if not self._atexit_registered:
+            atexit.register(self.flush)
+            self._atexit_registered = True
+        
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush()
+    
     def assign_colors_for_movie(self, movie_title: str, characters: List[str], 
                                shape_type: str = 'rectangle') -> Dict[str, Dict[str, Any]]:
         """
@@ -112,72 +210,72 @@ class ColorManager:
         """
         logger.info(f"为电影 '{movie_title}' 的 {len(characters)} 个角色分配颜色")
         
+        movies = self.color_config['movies']
+        
         # 如果电影已存在配置，先检查是否需要更新
-        if movie_title in self.color_config['movies']:
-            existing_config = self.color_config['movies'][movie_title]
-            existing_characters = set(existing_config.get('characters', {}).keys())
-            new_characters = set(characters)
+        if movie_title in movies:
+            movie_config = movies[movie_title]
+            characters_dict = movie_config.setdefault('characters', {})
             
-            # 如果角色列表完全相同，直接返回现有配置
-            if existing_characters == new_characters:
+            # 如果角色列表完全相同，直接返回现有配置（字典成员判断，无需构建集合）
+            if len(characters_dict) == len(characters) and all(c in characters_dict for c in characters):
                 logger.info(f"电影 '{movie_title}' 已有完整的颜色配置")
-                return existing_config['characters']
+                return characters_dict
             
-            # 如果有新角色，为新角色分配颜色
-            characters_to_assign = list(new_characters - existing_characters)
+            # 如果有新角色，为新角色分配颜色（保持输入顺序，不依赖字符串哈希，每次运行结果一致）
+            characters_to_assign = [c for c in dict.fromkeys(characters) if c not in characters_dict]
             if characters_to_assign:
                 logger.info(f"为电影 '{movie_title}' 的 {len(characters_to_assign)} 个新角色分配颜色")
         else:
-            characters_to_assign = characters
-            self.color_config['movies'][movie_title] = {
+            characters_to_assign = list(dict.fromkeys(characters))
+            movie_config = movies[movie_title] = {
                 'characters': {},
                 'shape_type': shape_type,
                 'created_at': '',
                 'updated_at': ''
             }
+            characters_dict = movie_config['characters']
         
         # 获取已使用的颜色索引
-        used_color_indices = set()
-        if movie_title in self.color_config['movies']:
-            for char_config in self.color_config['movies'][movie_title]['characters'].values():
-                used_color_indices.add(char_config.get('color_index', 0))
+        used_color_indices = {char_config.get('color_index', 0) for char_config in characters_dict.values()}
         
         # 为角色分配颜色
-        character_configs = {}
-        available_colors = [i for i in range(len(self.COLOR_PALETTE)) if i not in used_color_indices]
+        palette_size = len(self.COLOR_PALETTE)
+        available_colors = [i for i in range(palette_size) if i not in used_color_indices]
         
-        # 如果可用颜色不足，重新开始使用颜色
+        # 如果可用颜色不足，从已有角色数之后开始按顺序循环使用调色板（结果确定，可复现）
         if len(available_colors) < len(characters_to_assign):
-            available_colors = list(range(len(self.COLOR_PALETTE)))
-            random.shuffle(available_colors)
+            base_offset = len(characters_dict)
+            available_colors = [(base_offset + i) % palette_size for i in range(palette_size)]
+        
+        color_table = self._COLOR_TABLE
+        line_thickness = self.color_config['global_settings']['line_thickness']
+        char_index = self._char_index
         
         for i, character in enumerate(characters_to_assign):
             color_index = available_colors[i % len(available_colors)]
-            color_bgr = self.COLOR_PALETTE[color_index]
             
             character_config = {
                 'character_name': character,
-                'color_bgr': color_bgr,
-                'color_rgb': (color_bgr[2], color_bgr[1], color_bgr[0]),  # 转换为RGB
-                'color_hex': f"#{color_bgr[2]:02x}{color_bgr[1]:02x}{color_bgr[0]:02x}",
+                **color_table[color_index],  # color_bgr / color_rgb / color_hex
                 'color_index': color_index,
                 'shape_type': shape_type,
-                'line_thickness': self.color_config['global_settings']['line_thickness'],
+                'line_thickness': line_thickness,
                 'priority': i,  # 角色优先级，0为最高
             }
             
-            character_configs[character] = character_config
-            self.color_config['movies'][movie_title]['characters'][character] = character_config
+            characters_dict[character] = character_config
+            char_index[(movie_title, character)] = character_config
         
         # 更新电影配置
-        self.color_config['movies'][movie_title]['shape_type'] = shape_type
-        self.color_config['movies'][movie_title]['updated_at'] = ''
+        movie_config['shape_type'] = shape_type
+        movie_config['updated_at'] = ''
         
-        # 保存配置
-        self._save_color_config()
+        # 保存配置（批量模式中延迟到批量结束）
+        self._commit()
         
         # 返回完整的角色配置
-        return self.color_config['movies'][movie_title]['characters']
+        return characters_dict
     
     def get_character_color(self, movie_title: str, character_name: str) -> Optional[Dict[str, Any]]:
         """
@@ -190,10 +288,7 @@ class ColorManager:
         Returns:
             颜色配置字典或None
         """
-        if movie_title in self.color_config['movies']:
-            characters = self.color_config['movies'][movie_title].get('characters', {})
-            return characters.get(character_name)
-        return None
+        return self._char_index.get((movie_title, character_name))
     
     def get_movie_color_config(self, movie_title: str) -> Optional[Dict[str, Any]]:
         """
@@ -227,9 +322,13 @@ class ColorManager:
         if movie_title in self.color_config['movies']:
             characters = self.color_config['movies'][movie_title].get('characters', {})
             if character_name in characters:
+                # 框形未变化时无需重写配置文件
+                if characters[character_name].get('shape_type') == shape_type:
+                    return True
+                
                 characters[character_name]['shape_type'] = shape_type
                 self.color_config['movies'][movie_title]['updated_at'] = ''
-                return self._save_color_config()
+                return self._commit()
         
         logger.warning(f"未找到角色配置: {movie_title} - {character_name}")
         return False
@@ -245,27 +344,21 @@ class ColorManager:
             是否删除成功
         """
         if movie_title in self.color_config['movies']:
+            for character_name in self.color_config['movies'][movie_title].get('characters', {}):
+                self._char_index.pop((movie_title, character_name), None)
             del self.color_config['movies'][movie_title]
             logger.info(f"删除电影 '{movie_title}' 的颜色配置")
-            return self._save_color_config()
+            return self._commit()
         return False
     
     def get_color_palette_info(self) -> List[Dict[str, Any]]:
-        """获取颜色调色板信息"""
-        palette_info = []
-        for i, color_bgr in enumerate(self.COLOR_PALETTE):
-            color_rgb = (color_bgr[2], color_bgr[1], color_bgr[0])
-            color_hex = f"#{color_rgb[0]:02x}{color_rgb[1]:02x}{color_rgb[2]:02x}"
-            
-            palette_info.append({
-                'index': i,
-                'color_bgr': color_bgr,
-                'color_rgb': color_rgb,
-                'color_hex': color_hex,
-                'name': f"Color {i+1}"
-            })
-        
-        return palette_info
+        """获取颜色调色板信息（调色板为类常量，结果只构建一次）"""
+        if self._palette_info is None:
+            self._palette_info = [
+                {'index': i, **color_entry, 'name': f"Color {i+1}"}
+                for i, color_entry in enumerate(self._COLOR_TABLE)
+            ]
+        return self._palette_info
     
     def export_color_dictionary(self) -> Dict[str, Any]:
         """
@@ -274,25 +367,25 @@ class ColorManager:
         Returns:
             包含所有电影和角色颜色信息的字典
         """
-        export_data = {
-            'color_dictionary': {
-                'version': self.color_config.get('version', '1.0'),
-                'export_time': '',
-                'movies': {},
-                'color_palette': self.get_color_palette_info(),
-                'shape_types': self.SHAPE_TYPES
-            }
-        }
-        
         # 处理每部电影的颜色配置
-        for movie_title, movie_config in self.color_config['movies'].items():
-            export_data['color_dictionary']['movies'][movie_title] = {
+        movies_section = {
+            movie_title: {
                 'title': movie_title,
                 'shape_type': movie_config.get('shape_type', 'rectangle'),
-                'character_count': len(movie_config.get('characters', {})),
-                'characters': movie_config.get('characters', {}),
+                'character_count': len(characters := movie_config.get('characters', {})),
+                'characters': characters,
                 'created_at': movie_config.get('created_at', ''),
                 'updated_at': movie_config.get('updated_at', '')
             }
+            for movie_title, movie_config in self.color_config['movies'].items()
+        }
         
-        return export_data
+        return {
+            'color_dictionary': {
+                'version': self.color_config.get('version', '1.0'),
+                'export_time': '',
+                'movies': movies_section,
+                'color_palette': self.get_color_palette_info(),
+                'shape_types': self.SHAPE_TYPES
+            }
+        }
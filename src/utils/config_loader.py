@@ -3,10 +3,18 @@
 """
 import yaml
 import os
+import threading
 from pathlib import Path
 from typing import Dict, Any
 from dotenv import load_dotenv
 
+# 优先使用libyaml实现的C加载器/输出器，不可用时回退到纯Python实现
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+# 配置查找缓存中表示“键不存在”的标记
+_MISSING = object()
+
 
 class ConfigLoader:
     """配置加载器类"""
@@ -24,6 +32,10 @@ class ConfigLoader:
         
         self.config_path = Path(config_path)
         self.config = self._load_config()
+        self._resolve_paths()
+        
+        # 键路径查找缓存，配置更新时清空
+        self._cache: Dict[str, Any] = {}
         
         # 加载环境变量
         env_path = self.config_path.parent.parent / ".env"
@@ -34,13 +46,31 @@ class ConfigLoader:
         """加载YAML配置文件"""
         try:
             with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+                content = f.read()
+            config = yaml.load(content, Loader=YAML_LOADER)
             return config
         except FileNotFoundError:
             raise FileNotFoundError(f"配置文件不存在: {self.config_path}")
         except yaml.YAMLError as e:
             raise ValueError(f"配置文件格式错误: {e}")
     
+    def _resolve_paths(self):
+        """加载时将存储目录和日志文件的相对路径一次性转换为基于项目根目录的绝对路径"""
+        project_root = self.config_path.parent.parent
+        
+        storage_config = self.config.get('storage') or {}
+        for key in ['images_dir', 'embeddings_dir', 'metadata_dir']:
+            if key in storage_config:
+                path = Path(storage_config[key])
+                if not path.is_absolute():
+                    storage_config[key] = str(project_root / path)
+        
+        logging_config = self.config.get('logging') or {}
+        if 'file' in logging_config:
+            log_path = Path(logging_config['file'])
+            if not log_path.is_absolute():
+                logging_config['file'] = str(project_root / log_path)
+    
     def get(self, key_path: str, default=None):
         """
         获取配置值，支持嵌套键访问
@@ -52,17 +82,30 @@ class ConfigLoader:
         Returns:
             配置值
         """
-        keys = key_path.split('.')
+        try:
+            value = self._cache[key_path]
+        except KeyError:
+            value = self._lookup(key_path)
+            self._cache[key_path] = value
+        
+        return default if value is _MISSING else value
+    
+    def _lookup(self, key_path: str):
+        """按键路径遍历配置字典，键不存在时返回_MISSING"""
         value = self.config
         
-        for key in keys:
+        for key in key_path.split('.'):
             if isinstance(value, dict) and key in value:
                 value = value[key]
             else:
-                return default
+                return _MISSING
         
         return value
     
+    def clear_cache(self):
+        """清空配置查找缓存"""
+        self._cache.clear()
+    
     def get_tmdb_config(self) -> Dict[str, Any]:
         """获取TMDB配置"""
         tmdb_config = self.get('tmdb', {})
@@ -87,18 +130,8 @@ class ConfigLoader:
         return self.get('vector_database', {})
     
     def get_storage_config(self) -> Dict[str, Any]:
-        """获取存储配置"""
-        storage_config = self.get('storage', {})
-        
-        # 确保路径是绝对路径
-        project_root = self.config_path.parent.parent
-        for key in ['images_dir', 'embeddings_dir', 'metadata_dir']:
-            if key in storage_config:
-                path = Path(storage_config[key])
-                if not path.is_absolute():
-                    storage_config[key] = str(project_root / path)
-        
-        return storage_config
+        """获取存储配置（路径已在加载时转换为绝对路径）"""
+        return self.get('storage', {})
     
     def get_web_config(self) -> Dict[str, Any]:
         """获取Web配置"""
@@ -109,17 +142,8 @@ class ConfigLoader:
         return self.get('video_processing', {})
     
     def get_logging_config(self) -> Dict[str, Any]:
-        """获取日志配置"""
-        logging_config = self.get('logging', {})
-        
-        # 确保日志文件路径是绝对路径
-        if 'file' in logging_config:
-            log_path = Path(logging_config['file'])
-            if not log_path.is_absolute():
-                project_root = self.config_path.parent.parent
-                logging_config['file'] = str(project_root / log_path)
-                
-        return logging_config
+        """获取日志配置（日志文件路径已在加载时转换为绝对路径）"""
+        return self.get('logging', {})
     
     def update_config(self, key_path: str, value) -> bool:
         """
@@ -143,8 +167,13 @@ class ConfigLoader:
                     current_dict[key] = {}
                 current_dict = current_dict[key]
             
+            # 值未变化时无需重写配置文件
+            if keys[-1] in current_dict and current_dict[keys[-1]] == value:
+                return True
+            
             # 设置最终值
             current_dict[keys[-1]] = value
+            self.clear_cache()
             
             # 保存到文件
             return self.save_config()
@@ -157,7 +186,7 @@ class ConfigLoader:
         """保存配置到文件"""
         try:
             with open(self.config_path, 'w', encoding='utf-8') as f:
-                yaml.dump(self.config, f, default_flow_style=False, 
+                yaml.dump(self.config, f, Dumper=YAML_DUMPER, default_flow_style=False,
                          allow_unicode=True, indent=2)
             print(f"配置已保存到: {self.config_path}")
             return True
@@ -167,5 +196,23 @@ class ConfigLoader:
             return False
 
 
+class _LazyConfig:
+    """全局配置代理：首次访问属性时才加载配置文件，避免导入模块时就解析YAML"""
+    
+    def __init__(self):
+        self._instance = None
+        self._lock = threading.Lock()
+    
+    def _load(self) -> ConfigLoader:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = ConfigLoader()
+        return self._instance
+    
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+
 # 全局配置实例
-config = ConfigLoader()
+config = _LazyConfig()
@@ -2,6 +2,8 @@
 日志管理模块
 """
 import os
+import sys
+import threading
 from pathlib import Path
 from loguru import logger
 from .config_loader import config
@@ -19,13 +21,14 @@ def setup_logger():
     
     # 控制台输出
     logger.add(
-        sink=lambda msg: print(msg, end=""),
+        sink=sys.stderr,
         level=log_level,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
                "<level>{level: <8}</level> | "
                "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
                "<level>{message}</level>",
-        colorize=True
+        colorize=True,
+        enqueue=True  # 由后台线程完成格式化输出，避免阻塞工作线程
     )
     
     # 文件输出
@@ -40,6 +43,7 @@ def setup_logger():
                 sink=log_file,
                 level=log_level,
                 format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+                colorize=False,  # 文件格式不含颜色标签，跳过颜色标记解析
                 rotation=logging_config.get('rotation', logging_config.get('max_size', '10MB')),
                 retention=logging_config.get('retention', f"{logging_config.get('backup_count', 5)} days"),
                 encoding='utf-8-sig',  # 使用带BOM的UTF-8，确保Windows兼容性
@@ -56,14 +60,39 @@ def setup_logger():
     return logger
 
 
-# 初始化日志器
-setup_logger()
+# 日志器在第一条日志记录发出时才初始化，只导入模块、获取日志器时不加载配置
+_logger_initialized = False
+_init_lock = threading.Lock()
+
+
+def _ensure_logger_setup(record=None):
+    """
+    确保日志配置只初始化一次
+    
+    注册为loguru的patcher，在处理器输出第一条记录之前调用；
+    初始化完成后处理器集合已替换，该条记录会直接写入新配置的输出
+    """
+    global _logger_initialized
+    if _logger_initialized:
+        return
+    with _init_lock:
+        if not _logger_initialized:
+            setup_logger()
+            _logger_initialized = True
+
+
+logger.configure(patcher=_ensure_logger_setup)
 
 
 def get_logger(name: str = None):
     """
     获取日志器实例
     
+    热点循环中的debug日志请传参而不是使用f-string，参数计算开销大时使用lazy模式，
+    只有日志级别生效时才会格式化消息、计算参数：
+        logger.debug("检测到 {} 张人脸", len(faces))
+        logger.opt(lazy=True).debug("来源: {}", lambda: Path(image_path).name)
+    
     Args:
         name: 日志器名称
         
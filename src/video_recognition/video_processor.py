@@ -193,7 +193,7 @@ class VideoFaceRecognizer:
         
         try:
             with open(self.checkpoint_file, 'w', encoding='utf-8') as f:
-                json.dump(checkpoint_data, f, ensure_ascii=False, indent=2)
+                f.write(json.dumps(checkpoint_data, ensure_ascii=False, indent=2))
             logger.debug(f"检查点已保存: 第{current_frame}帧")
         except Exception as e:
             logger.warning(f"保存检查点失败: {e}")
@@ -208,8 +208,8 @@ class VideoFaceRecognizer:
             return None
         
         try:
-            with open(checkpoint_file, 'r', encoding='utf-8') as f:
-                checkpoint_data = json.load(f)
+            with open(checkpoint_file, 'rb') as f:
+                checkpoint_data = json.loads(f.read())
             
             # 验证检查点是否匹配当前配置
             if (checkpoint_data.get('movie_title') == self.movie_title and
@@ -238,26 +238,37 @@ class VideoFaceRecognizer:
         
         return actor_name in main_actors
     
-    def _search_in_movie_scope(self, face_embedding: np.ndarray) -> list:
-        """在电影范围内搜索相似人脸"""
+    def _search_in_movie_scope(self, face_embeddings: np.ndarray) -> List[list]:
+        """
+        在电影范围内批量搜索相似人脸（一帧中的所有人脸一次查询）
+        
+        Args:
+            face_embeddings: 形状为(N, dimension)的人脸特征
+            
+        Returns:
+            每个人脸对应的匹配结果列表
+        """
         if not self.movie_title or not self.movie_actors:
             # 如果没有指定电影或没有电影数据，使用全库搜索
-            return self.vector_db.search_similar_faces(
-                face_embedding, 
+            return self.vector_db.search_similar_faces_batch(
+                face_embeddings, 
                 top_k=1, 
                 min_similarity=self.similarity_threshold
             )
         
+        # 获取所有相似人脸
+        batch_results = self.vector_db.search_similar_faces_batch(
+            face_embeddings, 
+            top_k=50,  # 获取更多候选
+            min_similarity=0.3  # 降低阈值获取更多候选
+        )
+        return [self._select_movie_scope_match(all_results) for all_results in batch_results]
+    
+    def _select_movie_scope_match(self, all_results: list) -> list:
+        """从候选结果中选出属于目标电影的最佳匹配"""
         results = []
         
         try:
-            # 获取所有相似人脸
-            all_results = self.vector_db.search_similar_faces(
-                face_embedding, 
-                top_k=50,  # 获取更多候选
-                min_similarity=0.3  # 降低阈值获取更多候选
-            )
-            
             # 过滤出属于目标电影的结果
             for result in all_results:
                 metadata = result.get('metadata', {})
@@ -278,7 +289,7 @@ class VideoFaceRecognizer:
                 same_similarity_results = [r for r in results if abs(r['similarity'] - top_similarity) < 0.001]
                 
                 if len(same_similarity_results) > 1:
-                    logger.debug(f"发现 {len(same_similarity_results)} 个相同相似度结果，进行智能选择")
+                    logger.debug("发现 {} 个相同相似度结果，进行智能选择", len(same_similarity_results))
                     
                     # 智能选择策略：优先考虑主要演员
                     actor_scores = {}
@@ -313,7 +324,7 @@ class VideoFaceRecognizer:
                             best_score = total_score
                             best_actor = actor_name
                     
-                    logger.debug(f"智能选择结果: {best_actor} (得分: {best_score:.2f})")
+                    logger.debug("智能选择结果: {} (得分: {:.2f})", best_actor, best_score)
                     
                     # 选择最佳演员的结果
                     if best_actor:
@@ -344,18 +355,19 @@ class VideoFaceRecognizer:
             
             recognized_faces = []
             
-            for i, face_info in enumerate(faces):
+            # 在电影范围内搜索相似人脸（如果指定了电影），一帧中的所有人脸合并为一次查询
+            embeddings = np.stack([face_info['embedding'] for face_info in faces])
+            batch_results = self._search_in_movie_scope(embeddings)
+            if len(batch_results) != len(faces):
+                batch_results = [[] for _ in faces]
+            
+            for i, (face_info, similar_results) in enumerate(zip(faces, batch_results)):
                 try:
-                    # 提取人脸特征
-                    embedding = face_info['embedding']
-                    
-                    # 在电影范围内搜索相似人脸（如果指定了电影）
-                    similar_results = self._search_in_movie_scope(embedding)
                     
                     # 构建识别结果
                     recognition_result = {
                         'face_id': i,
-                        'bbox': face_info['bbox'],
+                        'bbox': self.face_processor.to_json_dict(face_info)['bbox'],
                         'det_score': face_info['det_score'],
                         'age': face_info.get('age'),
                         'gender': face_info.get('gender'),
@@ -416,6 +428,8 @@ class VideoFaceRecognizer:
             标注后的视频帧
         """
         annotated_frame = frame.copy()
+        # 收集所有标签，最后在同一画布上一次性绘制
+        text_items = []
         
         for result in recognition_results:
             bbox = result['bbox']
@@ -457,15 +471,14 @@ class VideoFaceRecognizer:
                 label = f"{display_name} ({similarity:.2f})"
                 
                 # 使用中文文字渲染器绘制标签 - 使用描边而不是纯色背景
-                annotated_frame = self.text_renderer.draw_text_with_outline(
-                    annotated_frame, 
-                    label, 
-                    (x1 + 5, y1 - 5),
-                    font_size=18,
-                    text_color=color,  # 使用人物配色作为文字颜色
-                    outline_color=(0, 0, 0),  # 黑色描边
-                    outline_width=2
-                )
+                text_items.append({
+                    'text': label,
+                    'position': (x1 + 5, y1 - 5),
+                    'font_size': 18,
+                    'color': color,  # 使用人物配色作为文字颜色
+                    'outline_color': (0, 0, 0),  # 黑色描边
+                    'outline_width': 2
+                })
             else:
                 # 未识别的人脸 - 灰色框
                 color = (128, 128, 128)
@@ -473,15 +486,16 @@ class VideoFaceRecognizer:
                 
                 # 标记为未知 - 使用描边而不是纯色背景
                 label = "未知"
-                annotated_frame = self.text_renderer.draw_text_with_outline(
-                    annotated_frame, 
-                    label, 
-                    (x1 + 5, y1 - 5),
-                    font_size=18,
-                    text_color=(255, 255, 255),  # 白色文字
-                    outline_color=(0, 0, 0),  # 黑色描边
-                    outline_width=2
-                )
+                text_items.append({
+                    'text': label,
+                    'position': (x1 + 5, y1 - 5),
+                    'font_size': 18,
+                    'color': (255, 255, 255),  # 白色文字
+                    'outline_color': (0, 0, 0),  # 黑色描边
+                    'outline_width': 2
+                })
+        
+        annotated_frame = self.text_renderer.draw_texts_on_image(annotated_frame, text_items)
         
         return annotated_frame
     
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+测试批量人脸检测的特征向量对应关系
+用替身模型驱动batch_detect_faces，验证某张图片处理失败时，
+其余图片的每张人脸仍拿到由自己的对齐图提取的特征向量
+"""
+import sys
+import numpy as np
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.face_recognition.face_processor import FaceProcessor, ARCFACE_SRC_112
+
+IMAGE_SIZE = 240
+# 每张图片填充不同的灰度值，对齐图中心像素即可标识其来源图片
+GOOD_VALUE_1 = 60
+BAD_VALUE = 120
+GOOD_VALUE_2 = 180
+
+
+class FakeDetector:
+    """每张图片返回两张人脸，关键点为平移后的标准模板"""
+
+    def detect(self, image, max_num=0, metric='default'):
+        bboxes = np.array([[10, 10, 120, 120, 0.9],
+                           [100, 100, 220, 220, 0.8]], dtype=np.float32)
+        kpss = np.stack([ARCFACE_SRC_112 + 10, ARCFACE_SRC_112 + 100]).astype(np.float32)
+        return bboxes, kpss
+
+
+class FakeGenderAge:
+    """在失败图片的第二张人脸上抛出异常，模拟单张人脸推理失败"""
+
+    def get(self, image, face):
+        if image[0, 0, 0] == BAD_VALUE and face.det_score < 0.85:
+            raise RuntimeError("genderage推理失败")
+        face.gender = 1
+        face.age = 30
+
+
+class FakeRecognizer:
+    """特征向量的第一维为对齐图中心像素值"""
+
+    input_size = (112, 112)
+
+    def get_feat(self, crops):
+        return np.array([[crop[56, 56, 0], 1.0] for crop in crops], dtype=np.float32)
+
+
+class FakeApp:
+    def __init__(self):
+        self.det_model = FakeDetector()
+        self.models = {
+            'detection': self.det_model,
+            'genderage': FakeGenderAge(),
+            'recognition': FakeRecognizer(),
+        }
+
+
+def make_image(value: int) -> np.ndarray:
+    return np.full((IMAGE_SIZE, IMAGE_SIZE, 3), value, dtype=np.uint8)
+
+
+def test_failed_image_between_good_images():
+    """测试失败图片夹在两张正常图片之间时特征向量不错位"""
+    print("测试失败图片不影响其他图片的特征向量...")
+    try:
+        processor = FaceProcessor.__new__(FaceProcessor)
+        processor.app = FakeApp()
+
+        images = [make_image(GOOD_VALUE_1), make_image(BAD_VALUE), make_image(GOOD_VALUE_2)]
+        results = processor.batch_detect_faces(images)
+
+        if [len(faces) for faces in results] != [2, 0, 2]:
+            print(f"❌ 各图片人脸数错误: {[len(faces) for faces in results]}")
+            return False
+
+        for faces, expected in ((results[0], GOOD_VALUE_1), (results[2], GOOD_VALUE_2)):
+            for face in faces:
+                if face['embedding'][0] != expected:
+                    print(f"❌ 人脸拿到了其他图片的特征向量: {face['embedding'][0]} != {expected}")
+                    return False
+
+        print("✅ 每张人脸都拿到了自己的特征向量")
+        return True
+
+    except Exception as e:
+        print(f"❌ 批量检测测试失败: {e}")
+        return False
+
+
+def main():
+    """主函数"""
+    print("🧪 批量人脸检测测试")
+    print("=" * 50)
+
+    test_results = [("失败图片隔离", test_failed_image_between_good_images())]
+
+    print("\n" + "=" * 50)
+    passed = sum(1 for _, result in test_results if result)
+    for test_name, result in test_results:
+        print(f"{test_name}: {'✅ 通过' if result else '❌ 失败'}")
+    print(f"\n总结: {passed}/{len(test_results)} 测试通过")
+
+    return passed == len(test_results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
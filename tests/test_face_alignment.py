@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+测试人脸对齐的相似变换求解
+验证Umeyama闭式解与OpenCV的estimateAffinePartial2D在5点模板上结果一致
+"""
+import sys
+import cv2
+import numpy as np
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.face_recognition.face_processor import FaceProcessor, ARCFACE_SRC_112
+
+
+def random_keypoints(rng: np.random.Generator, noise: float) -> np.ndarray:
+    """对标准模板施加随机相似变换（可叠加噪声），模拟检测到的5个关键点"""
+    angle = rng.uniform(-np.pi / 4, np.pi / 4)
+    scale = rng.uniform(0.5, 4.0)
+    rotation = scale * np.array([[np.cos(angle), -np.sin(angle)],
+                                 [np.sin(angle), np.cos(angle)]])
+    shift = rng.uniform(0, 500, size=2)
+    kps = ARCFACE_SRC_112 @ rotation.T + shift
+    return kps + rng.normal(0, noise, size=kps.shape)
+
+
+def apply_transform(tform: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """对点集应用2x3仿射变换"""
+    return points @ tform[:, :2].T + tform[:, 2]
+
+
+def test_matches_opencv(noise: float, atol: float = 1e-3) -> bool:
+    """测试在给定噪声下与estimateAffinePartial2D的对齐结果一致（比较变换后的关键点，单位像素）"""
+    rng = np.random.default_rng(0)
+
+    for trial in range(100):
+        kps = random_keypoints(rng, noise)
+        tform = FaceProcessor._similarity_transform(kps, ARCFACE_SRC_112)
+        # 阈值足够大使5个点都是内点，再经LM迭代精化即为全部点上的最小二乘解
+        expected, _ = cv2.estimateAffinePartial2D(kps, ARCFACE_SRC_112, method=cv2.RANSAC,
+                                                  ransacReprojThreshold=1000, refineIters=100)
+
+        if expected is None:
+            print(f"❌ 第 {trial} 组OpenCV求解失败 (噪声 {noise})")
+            return False
+        error = np.abs(apply_transform(tform, kps) - apply_transform(expected, kps)).max()
+        if error > atol:
+            print(f"❌ 第 {trial} 组变换不一致 (噪声 {noise}): 最大偏差 {error:.6f} 像素")
+            return False
+
+    print(f"✅ 100组关键点变换一致 (噪声 {noise})")
+    return True
+
+
+def test_exact_alignment():
+    """测试无噪声时关键点被精确映射到标准模板"""
+    print("测试无噪声对齐...")
+    rng = np.random.default_rng(1)
+    kps = random_keypoints(rng, 0.0)
+    tform = FaceProcessor._similarity_transform(kps, ARCFACE_SRC_112)
+    aligned = apply_transform(tform, kps)
+
+    if not np.allclose(aligned, ARCFACE_SRC_112, atol=1e-6):
+        print(f"❌ 对齐后关键点偏离模板: {np.abs(aligned - ARCFACE_SRC_112).max()}")
+        return False
+
+    print("✅ 关键点精确映射到标准模板")
+    return True
+
+
+def main():
+    """主函数"""
+    print("🧪 人脸对齐相似变换测试")
+    print("=" * 50)
+
+    test_results = [("无噪声对齐", test_exact_alignment())]
+    print("\n测试与OpenCV一致性...")
+    test_results.append(("OpenCV一致性（无噪声）", test_matches_opencv(0.0)))
+    test_results.append(("OpenCV一致性（有噪声）", test_matches_opencv(2.0)))
+
+    print("\n" + "=" * 50)
+    passed = sum(1 for _, result in test_results if result)
+    for test_name, result in test_results:
+        print(f"{test_name}: {'✅ 通过' if result else '❌ 失败'}")
+    print(f"\n总结: {passed}/{len(test_results)} 测试通过")
+
+    return passed == len(test_results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+测试人脸检测NMS实现
+验证供numba编译的逐对比较实现与SCRFD自带的numpy实现结果一致
+"""
+import sys
+import numpy as np
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.face_recognition.nms import nms, _nms_loop, _nms_numpy, NUMBA_AVAILABLE
+
+
+def random_dets(rng: np.random.Generator, count: int) -> np.ndarray:
+    """生成随机检测框 [x1, y1, x2, y2, score]，框之间有较多重叠"""
+    xy = rng.uniform(0, 200, size=(count, 2))
+    wh = rng.uniform(10, 80, size=(count, 2))
+    scores = rng.uniform(0.5, 1.0, size=(count, 1))
+    return np.hstack([xy, xy + wh, scores]).astype(np.float32)
+
+
+def test_loop_matches_numpy():
+    """测试逐对比较实现与numpy实现保留的框一致"""
+    print("测试NMS实现一致性...")
+    rng = np.random.default_rng(0)
+
+    for trial in range(200):
+        dets = random_dets(rng, int(rng.integers(1, 60)))
+        thresh = float(rng.choice([0.3, 0.4, 0.5, 0.7]))
+
+        expected = _nms_numpy(dets, thresh)
+        result = _nms_loop(dets, thresh)
+        if not np.array_equal(expected, result):
+            print(f"❌ 第 {trial} 组结果不一致 (thresh={thresh}): {expected.tolist()} != {result.tolist()}")
+            return False
+
+    print("✅ 200组随机检测框结果一致")
+    return True
+
+
+def test_nms_entry():
+    """测试对外接口（安装numba时为编译后的实现）"""
+    print("\n测试NMS对外接口...")
+    rng = np.random.default_rng(1)
+    dets = random_dets(rng, 50)
+
+    expected = _nms_numpy(dets, 0.4)
+    result = nms(dets.astype(np.float64), 0.4)
+    if not np.array_equal(expected, result):
+        print(f"❌ nms() 结果与numpy实现不一致 (numba: {NUMBA_AVAILABLE})")
+        return False
+
+    empty = nms(np.zeros((0, 5), dtype=np.float32), 0.4)
+    if len(empty) != 0:
+        print("❌ 空输入应返回空结果")
+        return False
+
+    print(f"✅ nms() 结果正确 (numba: {NUMBA_AVAILABLE})")
+    return True
+
+
+def main():
+    """主函数"""
+    print("🧪 NMS测试")
+    print("=" * 50)
+
+    test_results = [
+        ("实现一致性", test_loop_matches_numpy()),
+        ("对外接口", test_nms_entry()),
+    ]
+
+    print("\n" + "=" * 50)
+    passed = sum(1 for _, result in test_results if result)
+    for test_name, result in test_results:
+        print(f"{test_name}: {'✅ 通过' if result else '❌ 失败'}")
+    print(f"\n总结: {passed}/{len(test_results)} 测试通过")
+
+    return passed == len(test_results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+测试Faiss向量数据库删除后的清理
+验证compact()之后元数据、ID映射与索引中的向量仍一一对应
+"""
+import sys
+import numpy as np
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database.vector_database import FaissVectorDatabase
+
+DIMENSION = 64
+VECTOR_COUNT = 50
+# 取回向量时允许的误差（SQ8为8bit量化存储，误差较大）
+RECONSTRUCT_ATOL = {'Flat': 1e-5, 'HNSW': 1e-5, 'SQ8': 2e-2}
+
+
+def build_database(index_type: str):
+    """创建测试数据库并添加随机向量，返回数据库和归一化后的原始向量"""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(VECTOR_COUNT, DIMENSION)).astype(np.float32)
+    metadata = [{'face_id': f"face_{i}", 'vector_index': i} for i in range(VECTOR_COUNT)]
+
+    db = FaissVectorDatabase(dimension=DIMENSION, index_type=index_type)
+    if not db.add_embeddings(vectors, metadata):
+        raise RuntimeError("添加向量失败")
+    return db, vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def check_alignment(db: FaissVectorDatabase, vectors: np.ndarray, deleted: set, atol: float) -> bool:
+    """检查元数据、ID映射和索引向量是否对齐"""
+    if db.index.ntotal != len(db.metadata):
+        print(f"❌ 向量数 {db.index.ntotal} 与元数据数 {len(db.metadata)} 不一致")
+        return False
+    if db.index.ntotal != VECTOR_COUNT - len(deleted):
+        print(f"❌ 剩余向量数错误: {db.index.ntotal}")
+        return False
+
+    stored = db.index.reconstruct_n(0, db.index.ntotal)
+    for position, meta in enumerate(db.metadata):
+        face_id = meta['face_id']
+        if face_id in deleted:
+            print(f"❌ 已删除的 {face_id} 仍在元数据中")
+            return False
+        if db.id_to_idx.get(face_id) != position:
+            print(f"❌ {face_id} 的ID映射为 {db.id_to_idx.get(face_id)}，应为 {position}")
+            return False
+        if not np.allclose(stored[position], vectors[meta['vector_index']], atol=atol):
+            print(f"❌ 位置 {position} 的向量与 {face_id} 不对应")
+            return False
+
+    if set(db.id_to_idx) & deleted:
+        print("❌ 已删除的face_id仍在ID映射中")
+        return False
+    return True
+
+
+def test_compact(index_type: str) -> bool:
+    """测试删除并清理后数据仍对齐，且搜索返回正确的元数据"""
+    print(f"\n测试{index_type}索引的删除清理...")
+    try:
+        db, vectors = build_database(index_type)
+
+        deleted = {f"face_{i}" for i in (0, 7, 8, 23, VECTOR_COUNT - 1)}
+        for face_id in sorted(deleted):
+            if not db.delete_by_id(face_id):
+                print(f"❌ 删除 {face_id} 失败")
+                return False
+
+        # 清理前搜索也应跳过已删除的向量
+        results = db.search_similar(vectors[7], top_k=1)
+        if results and results[0]['metadata']['face_id'] in deleted:
+            print("❌ 清理前搜索返回了已删除的人脸")
+            return False
+
+        db.compact()
+        if db.deleted_indices:
+            print("❌ 清理后墓碑集合未清空")
+            return False
+        if not check_alignment(db, vectors, deleted, RECONSTRUCT_ATOL[index_type]):
+            return False
+
+        # 每个保留的向量都应搜到自己的元数据
+        for meta in db.metadata:
+            results = db.search_similar(vectors[meta['vector_index']], top_k=1)
+            if not results or results[0]['metadata']['face_id'] != meta['face_id']:
+                print(f"❌ 搜索 {meta['face_id']} 未返回其自身的元数据")
+                return False
+
+        # 清理后继续添加，新向量应追加在末尾
+        extra = np.random.default_rng(1).normal(size=(1, DIMENSION)).astype(np.float32)
+        db.add_embeddings(extra, [{'face_id': 'face_extra', 'vector_index': -1}])
+        if db.id_to_idx.get('face_extra') != len(db.metadata) - 1 or db.index.ntotal != len(db.metadata):
+            print("❌ 清理后添加的向量位置错误")
+            return False
+
+        print(f"✅ {index_type}索引清理后元数据与向量保持对齐")
+        return True
+
+    except Exception as e:
+        print(f"❌ {index_type}索引测试失败: {e}")
+        return False
+
+
+def main():
+    """主函数"""
+    print("🧪 向量数据库删除清理测试")
+    print("=" * 50)
+
+    test_results = [(index_type, test_compact(index_type)) for index_type in ("Flat", "HNSW", "SQ8")]
+
+    print("\n" + "=" * 50)
+    passed = sum(1 for _, result in test_results if result)
+    for test_name, result in test_results:
+        print(f"{test_name}: {'✅ 通过' if result else '❌ 失败'}")
+    print(f"\n总结: {passed}/{len(test_results)} 测试通过")
+
+    return passed == len(test_results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -648,10 +648,7 @@ def create_app():
                 return jsonify({'error': f'未找到演员 {actor_name} 的数据'}), 404
             
             # 删除向量和元数据
-            deleted_count = 0
-            for face_id in face_ids_to_delete:
-                if vector_db.delete_face(face_id):
-                    deleted_count += 1
+            deleted_count = vector_db.delete_faces(face_ids_to_delete)
             
             # 删除图片文件
             deleted_images = 0
@@ -811,7 +808,7 @@ def create_app():
                             }
                             with open(meta_file, 'w', encoding='utf-8') as f:
                                 import json
-                                json.dump(empty_color_config, f, ensure_ascii=False, indent=2)
+                                f.write(json.dumps(empty_color_config, ensure_ascii=False, indent=2))
                             logger.info(f"重置颜色配置文件: {meta_file.name}")
                         else:
                             # 删除其他元数据文件
@@ -942,7 +939,7 @@ def create_app():
                         
                         # 保存更新后的配置
                         with open(color_config_file, 'w', encoding='utf-8') as f:
-                            json.dump(color_config, f, ensure_ascii=False, indent=2)
+                            f.write(json.dumps(color_config, ensure_ascii=False, indent=2))
                         
                         logger.info(f"删除电影颜色配置: {movie_title}")
                 
@@ -1014,15 +1011,17 @@ def create_app():
                 config.update_config('face_recognition.min_face_score', min_score)
                 config_updated = True
             
-            # 重新初始化face_processor实例以加载新配置
+            # 重新加载筛选配置（无需重新加载InsightFace模型）
             if config_updated:
                 nonlocal face_processor
                 try:
-                    face_processor = FaceProcessor()
-                    logger.info("face_processor实例已重新初始化，加载了新配置")
+                    if face_processor is None:
+                        face_processor = FaceProcessor()
+                    else:
+                        face_processor.reload_config()
                 except Exception as e:
-                    logger.error(f"重新初始化face_processor失败: {e}")
-                    return jsonify({'error': '更新配置后重新初始化失败'}), 500
+                    logger.error(f"重新加载face_processor配置失败: {e}")
+                    return jsonify({'error': '更新配置后重新加载失败'}), 500
             
             # 返回更新后的配置
             updated_config = face_processor.get_face_config()